@@ -9,29 +9,40 @@ This hook runs on every UserPromptSubmit event. It:
 
 Optimizations:
 - Incremental updates: Only parses new messages since last update
-- Single output file: Just index.json (no redundant files)
+- Append-only exchange log: index.jsonl grows by one line per new exchange,
+  and index.json holds only the small header, so per-prompt writes are O(new)
 - Stores byte offset for efficient incremental reads
+- Per-session cursor file lets a deleted index resume from the last offset
 """
 
+import io
 import json
+import mmap
 import os
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 
 # Add scripts directory to path for utils import
 sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
 
 from utils import (
+    exchange_to_row,
     extract_text_content,
+    json_loader,
+    json_loads,
+    json_dumps,
     make_preview,
-    truncate_text,
+    pair_messages,
+    save_index as save_index_header,
     INDEX_DIR,
     INDEX_FILE,
+    EXCHANGES_FILE,
     LOG_FILE,
-    PREVIEW_LENGTH,
+    PRETTY_INDEX,
     MAX_CHARS_PER_MESSAGE,
+    TRUNCATION_MARKER,
 )
 
 
@@ -43,6 +54,85 @@ def get_transcript_size(transcript_path: str) -> int:
         return 0
 
 
+def read_transcript_tail(transcript_path: str, byte_offset: int = 0) -> Tuple[bytes, int]:
+    """Read the transcript bytes past byte_offset.
+
+    A final line without a newline that is not valid JSON is still being
+    written; it is left unread so the next run parses it once complete.
+
+    Returns:
+        Tuple of (unread bytes, new byte offset)
+    """
+    if not transcript_path or not os.path.exists(transcript_path):
+        return b'', byte_offset
+
+    try:
+        with open(transcript_path, 'rb') as f:
+            # mmap can't map an empty file; nothing new past the offset anyway
+            if os.fstat(f.fileno()).st_size <= byte_offset:
+                return b'', byte_offset
+
+            # Map the file and copy out only the unread tail in one go
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                tail = mm[byte_offset:]
+    except Exception:
+        return b'', byte_offset
+
+    if not tail.endswith(b'\n'):
+        line_start = tail.rfind(b'\n') + 1
+        try:
+            json_loads(tail[line_start:])
+        except ValueError:
+            tail = tail[:line_start]
+
+    return tail, byte_offset + len(tail)
+
+
+def iter_transcript_entries(tail: bytes) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield (role, entry) for each user/assistant line in transcript bytes."""
+    loads = json_loader(len(tail))
+
+    # Iterate lines lazily in C: BytesIO shares the tail's buffer, so
+    # only one line at a time is copied instead of a list of them all
+    for line in io.BytesIO(tail):
+        # Skip tool results and system events without a full parse.
+        # Blank lines never pass this, and the JSON parser accepts
+        # surrounding whitespace, so lines are not stripped first.
+        if b'"user"' not in line and b'"assistant"' not in line:
+            continue
+
+        try:
+            entry = loads(line)
+        except json.JSONDecodeError:
+            continue
+
+        if not isinstance(entry, dict) or not isinstance(entry.get('message', {}), dict):
+            continue
+
+        role = entry.get('type', '') or entry.get('role', '')
+        if role not in ('user', 'assistant'):
+            role = entry.get('message', {}).get('role', '')
+
+        if role in ('user', 'assistant'):
+            yield role, entry
+
+
+def iter_transcript_messages(tail: bytes) -> Iterator[Dict[str, Any]]:
+    """Yield a role/text/timestamp message for each user or assistant entry with text."""
+    for role, entry in iter_transcript_entries(tail):
+        try:
+            text = extract_text_content(entry.get('message', {}))
+        except (AttributeError, TypeError):
+            # Malformed content (e.g. null or a number); skip the entry
+            continue
+        if text:
+            yield {
+                'role': role,
+                'text': text,
+                'timestamp': entry.get('timestamp', '')
+            }
+
+
 def parse_transcript_from_offset(
     transcript_path: str,
     byte_offset: int = 0
@@ -52,99 +142,169 @@ def parse_transcript_from_offset(
     Returns:
         Tuple of (messages list, new byte offset)
     """
-    messages = []
-    new_offset = byte_offset
+    tail, new_offset = read_transcript_tail(transcript_path, byte_offset)
+    return list(iter_transcript_messages(tail)), new_offset
+
+
+def make_exchange(idx: int, user_text: str, assistant_text: str, timestamp: str) -> Dict:
+    """Build an exchange dict, truncating stored text for size."""
+    preview = make_preview(user_text)
+    # Store full text for search, truncated for size (truncate_text inlined)
+    if len(user_text) > MAX_CHARS_PER_MESSAGE:
+        user_text = user_text[:MAX_CHARS_PER_MESSAGE] + TRUNCATION_MARKER
+    if len(assistant_text) > MAX_CHARS_PER_MESSAGE:
+        assistant_text = assistant_text[:MAX_CHARS_PER_MESSAGE] + TRUNCATION_MARKER
+    return {
+        'idx': idx,
+        'preview': preview,
+        'timestamp': timestamp,
+        'user_text': user_text,
+        'assistant_text': assistant_text,
+    }
 
-    if not transcript_path or not os.path.exists(transcript_path):
-        return messages, new_offset
 
-    try:
-        with open(transcript_path, 'r', encoding='utf-8') as f:
-            # Seek to offset if provided
-            if byte_offset > 0:
-                f.seek(byte_offset)
-
-            for line in f:
-                line_stripped = line.strip()
-                if not line_stripped:
-                    continue
-
-                try:
-                    entry = json.loads(line_stripped)
-                    role = entry.get('type', '') or entry.get('role', '')
-                    if role not in ('user', 'assistant'):
-                        message_obj = entry.get('message', {})
-                        role = message_obj.get('role', '')
-
-                    if role in ('user', 'assistant'):
-                        message_obj = entry.get('message', {})
-                        text = extract_text_content(message_obj)
-                        timestamp = entry.get('timestamp', '')
-
-                        if text:
-                            messages.append({
-                                'role': role,
-                                'text': text,
-                                'timestamp': timestamp
-                            })
-                except json.JSONDecodeError:
-                    continue
-
-            # Get final position
-            new_offset = f.tell()
+def build_new_exchanges(
+    messages: Iterable[Dict[str, Any]],
+    start_idx: int = 1
+) -> List[Dict]:
+    """Build exchanges from messages, starting at given index.
+
+    Returns list of dicts with: idx, preview, timestamp, user_text, assistant_text
+    """
+    return [
+        make_exchange(exchange_idx, user_msg['text'], assistant_msg['text'],
+                      user_msg.get('timestamp', ''))
+        for exchange_idx, (user_msg, assistant_msg)
+        in enumerate(pair_messages(messages), start=start_idx)
+    ]
+
+
+def parse_new_exchanges(
+    transcript_path: str,
+    byte_offset: int = 0,
+    start_idx: int = 1
+) -> Tuple[List[Dict], int]:
+    """Parse the transcript past byte_offset straight into exchanges.
+
+    Messages stream from the transcript into build_new_exchanges, so no
+    intermediate message list is built.
+
+    Returns:
+        Tuple of (new exchanges, new byte offset)
+    """
+    tail, new_offset = read_transcript_tail(transcript_path, byte_offset)
+    return build_new_exchanges(iter_transcript_messages(tail), start_idx), new_offset
+
+
+def get_cursor_file(session_id: str) -> Path:
+    """Get the path of the cursor file for a session."""
+    return INDEX_DIR / f'{session_id}.cursor'
+
+
+def save_cursor(index_data: Dict) -> None:
+    """Record where parsing stopped so a lost index can resume from there.
+
+    Written atomically (tmp + rename) so a crash never leaves a torn cursor.
+    """
+    cursor_file = get_cursor_file(index_data.get('session_id', 'unknown'))
+    tmp_file = cursor_file.with_suffix('.cursor.tmp')
 
+    try:
+        cursor = {
+            'session_start': index_data.get('session_start', ''),
+            'byte_offset': index_data.get('_byte_offset', 0),
+            'total_exchanges': index_data.get('total_exchanges', 0),
+            'exchanges_size': index_data.get('_exchanges_size', 0),
+            'last_mtime': index_data.get('_mtime'),
+        }
+        with open(tmp_file, 'wb') as f:
+            f.write(json_dumps(cursor, pretty=PRETTY_INDEX))
+        os.replace(tmp_file, cursor_file)
     except Exception:
         pass
 
-    return messages, new_offset
 
+def remove_stale_cursors(session_id: str) -> None:
+    """Delete cursor files left behind by previous sessions."""
+    keep = get_cursor_file(session_id).name
 
-def build_new_exchanges(
-    messages: List[Dict[str, Any]],
-    start_idx: int = 1
-) -> List[Dict]:
-    """Build exchanges from messages, starting at given index.
+    try:
+        for cursor_file in INDEX_DIR.glob('*.cursor'):
+            if cursor_file.name != keep:
+                cursor_file.unlink()
+    except Exception:
+        pass
 
-    Returns list of dicts with: idx, preview, timestamp, user_text, assistant_text
+
+def resume_index_from_cursor(session_id: str, transcript_path: str) -> Optional[Dict]:
+    """Rebuild a minimal index from the session cursor.
+
+    Only used when index.json is missing. The cursor is trusted only if the
+    transcript is unchanged since it was written; otherwise the caller falls
+    back to a full rebuild. Exchange numbering continues from the cursor.
     """
-    exchanges = []
-    i = 0
-    exchange_idx = start_idx
-
-    while i < len(messages):
-        if messages[i]['role'] == 'user':
-            user_msg = messages[i]
-            if i + 1 < len(messages) and messages[i + 1]['role'] == 'assistant':
-                assistant_msg = messages[i + 1]
-                exchanges.append({
-                    'idx': exchange_idx,
-                    'preview': make_preview(user_msg['text']),
-                    'timestamp': user_msg.get('timestamp', ''),
-                    # Store full text for search (truncated for size)
-                    'user_text': truncate_text(user_msg['text'], MAX_CHARS_PER_MESSAGE),
-                    'assistant_text': truncate_text(assistant_msg['text'], MAX_CHARS_PER_MESSAGE),
-                })
-                exchange_idx += 1
-                i += 2
-            else:
-                i += 1
-        else:
-            i += 1
+    cursor_file = get_cursor_file(session_id)
+    if not transcript_path or not cursor_file.exists():
+        return None
+
+    try:
+        with open(cursor_file, 'rb') as f:
+            cursor = json_loads(f.read())
+
+        if os.path.getmtime(transcript_path) != cursor.get('last_mtime'):
+            return None
+
+        index = {
+            'session_id': session_id,
+            'session_start': cursor.get('session_start', ''),
+            'updated_at': '',
+            'total_exchanges': cursor.get('total_exchanges', 0),
+            'transcript_path': transcript_path,
+            '_byte_offset': cursor.get('byte_offset', 0),
+            '_exchanges_size': cursor.get('exchanges_size', 0),
+            '_mtime': cursor.get('last_mtime'),
+        }
+        if not exchange_log_intact(index):
+            return None
+
+        save_index(index)
+        return index
+
+    except Exception:
+        return None
 
-    return exchanges
 
+def exchange_log_intact(index: Dict) -> bool:
+    """Check that the exchange log holds everything the header accounts for."""
+    try:
+        return os.path.getsize(EXCHANGES_FILE) >= index.get('_exchanges_size', 0)
+    except OSError:
+        return index.get('_exchanges_size', 0) == 0
+
+
+def load_existing_index(session_id: str, transcript_path: str = '') -> Optional[Dict]:
+    """Load existing index header if it matches current session.
 
-def load_existing_index(session_id: str) -> Optional[Dict]:
-    """Load existing index if it matches current session."""
-    if not INDEX_FILE.exists():
+    Returns None for single-file indexes written by older versions (which
+    keep exchanges inline) and when the exchange log is missing data, so the
+    caller rebuilds from scratch.
+    """
+    # Read once instead of stat-then-open; a missing header is the only
+    # case that falls back to the cursor
+    try:
+        data = INDEX_FILE.read_bytes()
+    except FileNotFoundError:
+        return resume_index_from_cursor(session_id, transcript_path)
+    except OSError:
         return None
 
     try:
-        with open(INDEX_FILE, 'r', encoding='utf-8') as f:
-            index = json.load(f)
+        index = json_loads(data)
 
-        # Only use if same session
-        if index.get('session_id') == session_id:
+        # Only use if same session and in the current on-disk format
+        if (index.get('session_id') == session_id
+                and 'exchanges' not in index
+                and exchange_log_intact(index)):
             return index
 
     except Exception:
@@ -153,20 +313,48 @@ def load_existing_index(session_id: str) -> Optional[Dict]:
     return None
 
 
-def save_index(index_data: Dict) -> None:
-    """Save the index to disk."""
+def append_exchanges(exchanges: List[Dict], log_size: int) -> int:
+    """Append exchanges to the exchange log, one compact row per line.
+
+    Args:
+        exchanges: New exchanges to append
+        log_size: Log size recorded in the header; anything past it is left
+            over from an interrupted run and is discarded first. Pass 0 to
+            start a fresh log.
+
+    Returns:
+        New size of the log in bytes
+    """
     INDEX_DIR.mkdir(parents=True, exist_ok=True)
 
-    try:
-        with open(INDEX_FILE, 'w', encoding='utf-8') as f:
-            json.dump(index_data, f, indent=2)
-    except Exception:
-        pass
+    # Serialize the whole batch first so it lands in a single write()
+    data = b''.join(
+        json_dumps(exchange_to_row(ex), pretty=False) + b'\n' for ex in exchanges
+    )
+
+    with open(EXCHANGES_FILE, 'ab') as f:
+        if f.tell() > log_size:
+            # truncate() leaves the position where it was; appends still go
+            # to the new end, but tell() would report the old one
+            f.truncate(log_size)
+        else:
+            log_size = f.tell()
+        f.write(data)
+
+    return log_size + len(data)
+
+
+def save_index(index_data: Dict) -> bool:
+    """Save the index header with utils.save_index, then update the session cursor."""
+    if not save_index_header(index_data):
+        return False
 
+    save_cursor(index_data)
+    return True
 
-def log_recall_event(session_id: str, exchange_count: int) -> None:
+
+def log_recall_event(session_id: str, exchange_count: int, timestamp: str) -> None:
     """Log recall event for observability."""
-    timestamp = datetime.now(timezone.utc).isoformat()
     log_entry = f"{timestamp} | session={session_id} | exchanges={exchange_count} | CONTEXT_RECALL_TRIGGERED\n"
 
     print(f"[context-recall] Context recall triggered at exchange #{exchange_count}", file=sys.stderr)
@@ -180,86 +368,107 @@ def log_recall_event(session_id: str, exchange_count: int) -> None:
         pass
 
 
-def main():
-    """Main entry point for the hook."""
-    try:
-        input_data = json.load(sys.stdin)
-
-        session_id = input_data.get('session_id', 'unknown')
-        transcript_path = input_data.get('transcript_path', '')
-        user_prompt = input_data.get('user_prompt', '')
+def write_result(result: Dict) -> None:
+    """Write the hook result to stdout as a single line of JSON."""
+    sys.stdout.buffer.write(json_dumps(result, pretty=False) + b'\n')
+    sys.stdout.flush()
 
-        now = datetime.now(timezone.utc).isoformat()
 
-        # Try to load existing index for incremental update
-        existing_index = load_existing_index(session_id)
+def run_hook(input_data: Dict[str, Any]) -> Dict:
+    """Update the index for one hook invocation and return the hook result."""
+    session_id = input_data.get('session_id', 'unknown')
+    transcript_path = input_data.get('transcript_path', '')
+    user_prompt = input_data.get('user_prompt', '')
 
-        if existing_index:
-            # Incremental update
-            last_offset = existing_index.get('_byte_offset', 0)
-            current_size = get_transcript_size(transcript_path)
+    now = datetime.now(timezone.utc).isoformat()
 
-            # Only parse if transcript has grown
-            if current_size > last_offset:
-                new_messages, new_offset = parse_transcript_from_offset(
-                    transcript_path, last_offset
+    # One stat serves both the change check and the new offset bookkeeping
+    try:
+        st = os.stat(transcript_path)
+        current_size, current_mtime = st.st_size, st.st_mtime
+    except OSError:
+        current_size, current_mtime = 0, None
+
+    # Try to load existing index for incremental update
+    existing_index = load_existing_index(session_id, transcript_path)
+
+    # Only write the index when something actually changed
+    dirty = False
+
+    if existing_index:
+        # Incremental update
+        index_data = existing_index
+        last_offset = index_data.get('_byte_offset', 0)
+        unchanged = (
+            index_data.get('_size') == current_size
+            and index_data.get('_mtime') == current_mtime
+        )
+
+        # Only parse if transcript has grown since the last run
+        if not unchanged and current_size > last_offset:
+            # Build new exchanges starting after existing ones
+            start_idx = index_data.get('total_exchanges', 0) + 1
+            new_exchanges, new_offset = parse_new_exchanges(
+                transcript_path, last_offset, start_idx
+            )
+
+            if new_exchanges:
+                index_data['_exchanges_size'] = append_exchanges(
+                    new_exchanges, index_data.get('_exchanges_size', 0)
                 )
+                index_data['total_exchanges'] = start_idx - 1 + len(new_exchanges)
+                index_data['updated_at'] = now
+                dirty = True
+
+            if new_offset != last_offset or index_data.get('_mtime') != current_mtime:
+                index_data['_byte_offset'] = new_offset
+                index_data['_size'] = current_size
+                index_data['_mtime'] = current_mtime
+                dirty = True
+    else:
+        # Full rebuild (new session or no existing index)
+        exchanges, byte_offset = parse_new_exchanges(transcript_path, 0, 1)
+
+        session_start = exchanges[0]['timestamp'] if exchanges else now
+
+        index_data = {
+            'session_id': session_id,
+            'session_start': session_start,
+            'updated_at': now,
+            'total_exchanges': len(exchanges),
+            'transcript_path': transcript_path,
+            '_byte_offset': byte_offset,
+            '_exchanges_size': append_exchanges(exchanges, 0),
+            '_size': current_size,
+            '_mtime': current_mtime,
+        }
+        remove_stale_cursors(session_id)
+        dirty = True
 
-                if new_messages:
-                    # Build new exchanges starting after existing ones
-                    start_idx = existing_index.get('total_exchanges', 0) + 1
-                    new_exchanges = build_new_exchanges(new_messages, start_idx)
-
-                    # Append to existing exchanges
-                    existing_index['exchanges'].extend(new_exchanges)
-                    existing_index['total_exchanges'] = len(existing_index['exchanges'])
-                    existing_index['updated_at'] = now
-                    existing_index['_byte_offset'] = new_offset
-
-                    save_index(existing_index)
-                    index_data = existing_index
-                else:
-                    # No new complete exchanges yet
-                    existing_index['_byte_offset'] = new_offset
-                    save_index(existing_index)
-                    index_data = existing_index
-            else:
-                index_data = existing_index
-        else:
-            # Full rebuild (new session or no existing index)
-            messages, byte_offset = parse_transcript_from_offset(transcript_path, 0)
-            exchanges = build_new_exchanges(messages, 1)
-
-            session_start = exchanges[0]['timestamp'] if exchanges else now
-
-            index_data = {
-                'session_id': session_id,
-                'session_start': session_start,
-                'updated_at': now,
-                'total_exchanges': len(exchanges),
-                'transcript_path': transcript_path,
-                'exchanges': exchanges,
-                '_byte_offset': byte_offset,
-            }
+    if dirty:
+        save_index(index_data)
 
-            save_index(index_data)
+    # Check if this is a /recall command
+    if user_prompt.strip().lower().startswith('/recall'):
+        log_recall_event(session_id, index_data.get('total_exchanges', 0), now)
+        return {
+            "systemMessage": f"[Observability] Context recall logged at exchange #{index_data.get('total_exchanges', 0)}"
+        }
+    return {}
 
-        # Check if this is a /recall command
-        if user_prompt.strip().lower().startswith('/recall'):
-            log_recall_event(session_id, index_data.get('total_exchanges', 0))
-            result = {
-                "systemMessage": f"[Observability] Context recall logged at exchange #{index_data.get('total_exchanges', 0)}"
-            }
-        else:
-            result = {}
 
-        print(json.dumps(result), file=sys.stdout)
+def main():
+    """Main entry point for the hook."""
+    try:
+        # Parse the raw bytes; skips a text-decoding pass over the prompt.
+        # The input is small, so this stays on the stdlib parser.
+        write_result(run_hook(json_loads(sys.stdin.buffer.read())))
 
     except Exception as e:
         error_output = {
             "systemMessage": f"[context-recall] Hook error (non-blocking): {str(e)}"
         }
-        print(json.dumps(error_output), file=sys.stdout)
+        write_result(error_output)
 
     finally:
         sys.exit(0)
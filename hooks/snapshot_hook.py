@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""Entry point for the UserPromptSubmit hook.
+
+Python recompiles the script it is asked to run on every launch, but caches
+bytecode for modules it imports. Keeping this launcher tiny and importing
+save_context_snapshot means the hook logic is compiled once, not on every
+prompt.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from save_context_snapshot import main
+
+if __name__ == '__main__':
+    main()
@@ -1,49 +1,58 @@
 #!/usr/bin/env python3
-"""Extract recent conversation context from saved snapshots.
+"""Extract recent conversation context from the conversation index.
 
-This script reads from context snapshots saved by the UserPromptSubmit hook.
-The hook saves the last 5 exchanges to ~/.claude/context-recall/current.json
-on every prompt, so this script always has fresh data to read from.
+This script reads the index maintained by the UserPromptSubmit hook
+(~/.claude/context-recall/index.json header + index.jsonl exchange log)
+and prints the most recent exchanges. The hook updates the index on
+every prompt, so this script always has fresh data to read from.
 
 Usage:
     Called via !` syntax in recall.md command.
-    Reads from ~/.claude/context-recall/current.json
+    Reads from ~/.claude/context-recall/index.json and index.jsonl
 """
 
-import json
-import os
 import sys
 from pathlib import Path
 from typing import List, Dict
 
+# Add scripts directory to path for utils import
+sys.path.insert(0, str(Path(__file__).parent))
+
+from utils import load_index_header, tail_exchanges
+
+# Number of most recent exchanges to show
+RECENT_EXCHANGES = 5
+
 
 def load_snapshot() -> Dict:
-    """Load the most recent context snapshot."""
-    snapshot_file = Path.home() / '.claude' / 'context-recall' / 'current.json'
+    """Load the index header with its most recent exchanges.
 
-    if not snapshot_file.exists():
-        return {}
+    Only the end of the exchange log is read, so the cost does not grow
+    with session length.
+    """
+    index = load_index_header()
 
-    try:
-        with open(snapshot_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception:
+    if not index:
         return {}
 
+    index['exchanges'] = tail_exchanges(index, RECENT_EXCHANGES)
+    return index
+
 
 def format_exchanges_as_markdown(exchanges: List[Dict]) -> str:
     """Format exchanges as readable markdown.
 
     Note: Messages are already truncated at save time by the hook
-    (max 1000 chars per message, max 8000 chars total).
+    (max 1000 chars per message).
     """
     if not exchanges:
         return "*No previous conversation history found. Make sure the context-recall plugin hooks are active.*"
 
     output = []
-    for idx, exchange in enumerate(exchanges, 1):
-        user_text = exchange.get('user', '')
-        assistant_text = exchange.get('assistant', '')
+    for exchange in exchanges:
+        idx = exchange.get('idx', '?')
+        user_text = exchange.get('user_text', '')
+        assistant_text = exchange.get('assistant_text', '')
         output.append(f"### Exchange {idx}\n\n**User:**\n{user_text}\n\n**Assistant:**\n{assistant_text}")
 
     return "\n\n---\n\n".join(output)
@@ -59,14 +68,14 @@ def main():
         return
 
     exchanges = snapshot.get('exchanges', [])
-    message_count = snapshot.get('message_count', 0)
-    timestamp = snapshot.get('timestamp', 'unknown')
+    total_exchanges = snapshot.get('total_exchanges', 0)
+    timestamp = snapshot.get('updated_at', 'unknown')
 
     if not exchanges:
         print("*No conversation exchanges found in the current session.*")
         return
 
-    print(f"*Context snapshot from {timestamp} ({message_count} messages in session)*\n")
+    print(f"*Context snapshot from {timestamp} ({total_exchanges} exchanges in session)*\n")
     formatted = format_exchanges_as_markdown(exchanges)
     print(formatted)
 
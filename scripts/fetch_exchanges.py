@@ -20,48 +20,49 @@ Improvements over original:
 """
 
 import sys
+from collections import deque
 from pathlib import Path
-from typing import List, Dict, Set
+from typing import Dict, Iterable, Iterator, List, Set
 
 # Add scripts directory to path for utils import
 sys.path.insert(0, str(Path(__file__).parent))
 
 from utils import (
-    load_index,
-    truncate_text,
+    load_index_header,
+    iter_exchanges,
+    tail_exchanges,
+    make_text_matcher,
     format_timestamp,
     format_short_date,
     parse_time_query,
     parse_date_time_query,
     find_exchanges_by_time,
     get_date_from_timestamp,
-    search_in_text,
-    MAX_CHARS_PER_MESSAGE,
     MAX_TOTAL_CHARS,
     AROUND_TIME_WINDOW,
 )
 
 
-def search_exchanges_full_content(exchanges: List[Dict], keyword: str) -> Set[int]:
-    """Search exchanges for keyword in FULL content (user + assistant text).
+def iter_matching_exchanges(exchanges: Iterable[Dict], keyword: str) -> Iterator[Dict]:
+    """Yield exchanges containing keyword in FULL content (user + assistant text).
 
-    This searches the actual content, not just the preview.
+    This searches the actual content, not just the preview. Accepts any
+    iterable, so exchanges can be streamed from the index without loading
+    them all at once.
     """
-    matching = set()
+    matches = make_text_matcher(keyword)
 
     for ex in exchanges:
-        # Search in user text
-        user_text = ex.get('user_text', ex.get('preview', ''))
-        if search_in_text(user_text, keyword):
-            matching.add(ex['idx'])
-            continue
+        user_text = ex.get('user_text')
+        if user_text is None:
+            user_text = ex.get('preview', '')
+        if matches(user_text) or matches(ex.get('assistant_text', '')):
+            yield ex
 
-        # Search in assistant text
-        assistant_text = ex.get('assistant_text', '')
-        if search_in_text(assistant_text, keyword):
-            matching.add(ex['idx'])
 
-    return matching
+def search_exchanges_full_content(exchanges: Iterable[Dict], keyword: str) -> Set[int]:
+    """Return the indices of exchanges matching keyword in full content."""
+    return {ex['idx'] for ex in iter_matching_exchanges(exchanges, keyword)}
 
 
 def parse_last_n(arg: str, total_exchanges: int) -> Set[int]:
@@ -84,35 +85,31 @@ def format_exchanges(exchanges: List[Dict], query_type: str = "") -> str:
     output = []
     total_chars = 0
 
-    for ex in exchanges:
+    for shown, ex in enumerate(exchanges):
         idx = ex.get('idx', '?')
-        time = format_timestamp(ex.get('timestamp', ''))
-        date = format_short_date(ex.get('timestamp', ''))
+        timestamp = ex.get('timestamp', '')
+        time = format_timestamp(timestamp)
+        date = format_short_date(timestamp)
         time_str = f" [{date} {time}]" if date and time else (f" [{time}]" if time else "")
 
-        # Use full content if available, fall back to preview
-        user_text = ex.get('user_text', ex.get('preview', ''))
+        # Use full content if available, fall back to preview. Both are
+        # already truncated to MAX_CHARS_PER_MESSAGE when the hook indexes them.
+        user_text = ex.get('user_text')
+        if user_text is None:
+            user_text = ex.get('preview', '')
         assistant_text = ex.get('assistant_text', '')
 
-        # Truncate for display
-        user_text = truncate_text(user_text, MAX_CHARS_PER_MESSAGE)
-        assistant_text = truncate_text(assistant_text, MAX_CHARS_PER_MESSAGE)
-
         exchange_chars = len(user_text) + len(assistant_text)
         if total_chars + exchange_chars > MAX_TOTAL_CHARS:
-            remaining = len(exchanges) - len([l for l in output if l.startswith('### Exchange')])
+            remaining = len(exchanges) - shown
             output.append(f"\n*[Reached size limit - {remaining} more exchanges not shown]*")
             break
 
-        output.append(f"### Exchange #{idx}{time_str}")
-        output.append("")
-        output.append(f"**User:**\n{user_text}")
-        output.append("")
-        if assistant_text:
-            output.append(f"**Assistant:**\n{assistant_text}")
-            output.append("")
-        output.append("---")
-        output.append("")
+        # One string per exchange rather than one list entry per line
+        assistant_block = f"**Assistant:**\n{assistant_text}\n\n" if assistant_text else ""
+        output.append(
+            f"### Exchange #{idx}{time_str}\n\n**User:**\n{user_text}\n\n{assistant_block}---\n"
+        )
 
         total_chars += exchange_chars
 
@@ -120,13 +117,14 @@ def format_exchanges(exchanges: List[Dict], query_type: str = "") -> str:
 
 
 def get_session_dates(exchanges: List[Dict]) -> List[str]:
-    """Get list of unique dates in the session."""
-    dates = set()
-    for ex in exchanges:
-        date = get_date_from_timestamp(ex.get('timestamp', ''))
-        if date:
-            dates.add(date)
-    return sorted(dates)
+    """Get list of unique dates in the session.
+
+    Exchanges are stored in chronological order, so first-seen order is
+    already sorted.
+    """
+    dates = dict.fromkeys(get_date_from_timestamp(ex.get('timestamp', '')) for ex in exchanges)
+    dates.pop(None, None)
+    return list(dates)
 
 
 def print_usage():
@@ -147,7 +145,7 @@ def main():
     if not args:
         args = ['last5']
 
-    index = load_index()
+    index = load_index_header()
 
     if not index:
         print("*No conversation index found. The recall hook may not be active yet.*")
@@ -155,13 +153,11 @@ def main():
         return
 
     total_exchanges = index.get('total_exchanges', 0)
-    exchanges_list = index.get('exchanges', [])
 
     if total_exchanges == 0:
         print("*No exchanges found in the current session.*")
         return
 
-    target_indices = set()
     query_type = ""
 
     first_arg = args[0].lower()
@@ -173,6 +169,8 @@ def main():
         if not target_indices:
             print(f"*Invalid format: {first_arg}. Try 'last5' or 'last10'.*")
             return
+        # Only the end of the exchange log needs to be read
+        selected_exchanges = tail_exchanges(index, len(target_indices))
 
     # Handle "around TIME" format (with date awareness)
     elif first_arg == 'around':
@@ -181,15 +179,17 @@ def main():
             return
 
         time_str = ' '.join(args[1:])
+        exchanges_list = list(iter_exchanges(index))
+
+        session_dates = get_session_dates(exchanges_list)
 
         # Try date-aware parsing first
-        result = parse_date_time_query(time_str, get_session_dates(exchanges_list))
+        result = parse_date_time_query(time_str, session_dates)
 
         if result:
             target_time, target_date = result
 
             # Show which dates are available if multi-day session
-            session_dates = get_session_dates(exchanges_list)
             if len(session_dates) > 1 and not target_date:
                 print(f"*Note: Session spans {len(session_dates)} days: {', '.join(format_short_date(d + 'T00:00:00Z') for d in session_dates)}*")
                 print(f"*Showing closest match to {time_str}. Specify date for precision (e.g., 'jan 5 2pm')*\n")
@@ -201,6 +201,8 @@ def main():
             if not target_indices:
                 print(f"*No exchanges found around {time_str}*")
                 return
+            # Already in memory, in index order; no need to re-read the log
+            selected_exchanges = [ex for ex in exchanges_list if ex['idx'] in target_indices]
         else:
             print(f"*Could not parse time: '{time_str}'. Try formats like '2pm', '2:30pm', 'jan 5 2pm'*")
             return
@@ -212,29 +214,31 @@ def main():
             return
 
         keyword = ' '.join(args[1:])
-        target_indices = search_exchanges_full_content(exchanges_list, keyword)
         query_type = f"search '{keyword}'"
 
-        if not target_indices:
+        # The log is in index order, so the last 10 matches are the most
+        # recent; keeping them during the scan avoids reading the log again
+        total_matches = 0
+        recent_matches = deque(maxlen=10)
+        for ex in iter_matching_exchanges(iter_exchanges(index), keyword):
+            recent_matches.append(ex)
+            total_matches += 1
+
+        if not total_matches:
             print(f"*No exchanges found matching '{keyword}'*")
             print("*Search looks in both user prompts AND assistant responses.*")
             return
 
         # Limit search results
-        if len(target_indices) > 10:
-            sorted_indices = sorted(target_indices, reverse=True)[:10]
-            target_indices = set(sorted_indices)
+        if total_matches > 10:
             print(f"*Found many matches for '{keyword}', showing 10 most recent:*\n")
+        selected_exchanges = list(recent_matches)
 
     else:
         print(f"*Unknown command: '{first_arg}'*\n")
         print_usage()
         return
 
-    # Filter exchanges to target indices
-    selected_exchanges = [ex for ex in exchanges_list if ex['idx'] in target_indices]
-    selected_exchanges.sort(key=lambda x: x['idx'])
-
     if not selected_exchanges:
         print(f"*Could not fetch exchanges.*")
         return
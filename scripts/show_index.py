@@ -32,8 +32,10 @@ from utils import (
     format_date,
     format_short_date,
     parse_time_query,
+    closest_position,
+    exchange_minutes,
     get_date_from_timestamp,
-    search_in_text,
+    make_text_matcher,
     PAGE_SIZE,
 )
 
@@ -43,20 +45,8 @@ def find_page_for_time(exchanges: List[Dict], target_time: datetime) -> int:
     if not exchanges:
         return 1
 
-    best_idx = 0
-    best_diff = float('inf')
-
-    for i, ex in enumerate(exchanges):
-        try:
-            ex_time = datetime.fromisoformat(ex['timestamp'].replace('Z', '+00:00'))
-            ex_minutes = ex_time.hour * 60 + ex_time.minute
-            target_minutes = target_time.hour * 60 + target_time.minute
-            diff = abs(ex_minutes - target_minutes)
-            if diff < best_diff:
-                best_diff = diff
-                best_idx = i
-        except Exception:
-            continue
+    target_minutes = target_time.hour * 60 + target_time.minute
+    best_idx = closest_position(exchange_minutes(exchanges), target_minutes)
 
     total = len(exchanges)
     pos_from_end = total - 1 - best_idx
@@ -66,19 +56,13 @@ def find_page_for_time(exchanges: List[Dict], target_time: datetime) -> int:
 
 def search_exchanges(exchanges: List[Dict], keyword: str) -> List[Dict]:
     """Search exchanges for keyword in preview AND full content."""
-    results = []
-    for ex in exchanges:
-        # Search preview
-        if search_in_text(ex.get('preview', ''), keyword):
-            results.append(ex)
-            continue
-        # Search full content if available
-        if search_in_text(ex.get('user_text', ''), keyword):
-            results.append(ex)
-            continue
-        if search_in_text(ex.get('assistant_text', ''), keyword):
-            results.append(ex)
-    return results
+    matches = make_text_matcher(keyword)
+    return [
+        ex for ex in exchanges
+        if matches(ex.get('preview', ''))
+        or matches(ex.get('user_text', ''))
+        or matches(ex.get('assistant_text', ''))
+    ]
 
 
 def get_session_date_range(exchanges: List[Dict]) -> str:
@@ -86,11 +70,8 @@ def get_session_date_range(exchanges: List[Dict]) -> str:
     if not exchanges:
         return ""
 
-    dates = set()
-    for ex in exchanges:
-        date = get_date_from_timestamp(ex.get('timestamp', ''))
-        if date:
-            dates.add(date)
+    dates = {get_date_from_timestamp(ex.get('timestamp', '')) for ex in exchanges}
+    dates.discard(None)
 
     if len(dates) == 0:
         return ""
@@ -118,8 +99,12 @@ def format_page(
     start_from_end = (page - 1) * PAGE_SIZE
     end_from_end = start_from_end + PAGE_SIZE
 
-    page_exchanges = list(reversed(exchanges))
-    page_slice = page_exchanges[start_from_end:end_from_end]
+    # Slice the page off the tail and reverse only those few exchanges
+    total = len(exchanges)
+    if start_from_end < 0:
+        page_slice = []
+    else:
+        page_slice = exchanges[max(0, total - end_from_end):max(0, total - start_from_end)][::-1]
 
     if not page_slice:
         return f"*Page {page} is empty. Total pages: {total_pages}*"
@@ -138,7 +123,8 @@ def format_page(
     # Group by date if multi-day session
     current_date = None
     for ex in page_slice:
-        ex_date = get_date_from_timestamp(ex.get('timestamp', ''))
+        timestamp = ex.get('timestamp', '')
+        ex_date = get_date_from_timestamp(timestamp)
 
         # Show date header if date changed
         if ex_date != current_date:
@@ -147,7 +133,7 @@ def format_page(
                 lines.append(f"\n**{format_short_date(ex_date + 'T00:00:00Z')}:**")
 
         idx = ex.get('idx', '?')
-        time = format_timestamp(ex.get('timestamp', ''))
+        time = format_timestamp(timestamp)
         preview = ex.get('preview', '(no preview)')
         lines.append(f"**#{idx}** [{time}] \"{preview}\"")
 
@@ -177,14 +163,15 @@ def format_search_results(results: List[Dict], keyword: str, total_exchanges: in
     # Group by date
     current_date = None
     for ex in results[:20]:
-        ex_date = get_date_from_timestamp(ex.get('timestamp', ''))
+        timestamp = ex.get('timestamp', '')
+        ex_date = get_date_from_timestamp(timestamp)
         if ex_date != current_date:
             current_date = ex_date
             if ex_date:
                 lines.append(f"\n**{format_short_date(ex_date + 'T00:00:00Z')}:**")
 
         idx = ex.get('idx', '?')
-        time = format_timestamp(ex.get('timestamp', ''))
+        time = format_timestamp(timestamp)
         preview = ex.get('preview', '(no preview)')
         lines.append(f"**#{idx}** [{time}] \"{preview}\"")
 
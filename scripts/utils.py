@@ -6,11 +6,14 @@ to avoid code duplication.
 """
 
 import json
+import mmap
 import os
 import re
-from datetime import datetime
+import sys
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Sequence, Tuple
 
 
 # Configuration constants
@@ -19,11 +22,94 @@ MAX_CHARS_PER_MESSAGE = 1000
 MAX_TOTAL_CHARS = 8000
 PAGE_SIZE = 20
 AROUND_TIME_WINDOW = 5
+TRUNCATION_MARKER = "\n\n[...truncated...]"
 
 # File paths
-INDEX_DIR = Path.home() / '.claude' / 'context-recall'
-INDEX_FILE = INDEX_DIR / 'index.json'
-LOG_FILE = Path.home() / '.claude' / 'recall-events.log'
+CLAUDE_DIR = Path.home() / '.claude'
+INDEX_DIR = CLAUDE_DIR / 'context-recall'
+INDEX_FILE = INDEX_DIR / 'index.json'          # Header: session metadata and offsets
+EXCHANGES_FILE = INDEX_DIR / 'index.jsonl'     # Append-only log, one exchange per line
+LOG_FILE = CLAUDE_DIR / 'recall-events.log'
+
+# Header and cursor files are written compact; set CLAUDE_RECALL_PRETTY_INDEX=1
+# to indent them for reading by hand
+PRETTY_INDEX = os.environ.get('CLAUDE_RECALL_PRETTY_INDEX') == '1'
+
+# Field order of an exchange log row; the exchange number is the line number
+EXCHANGE_FIELDS = ('preview', 'timestamp', 'user_text', 'assistant_text')
+
+# Buffer size for reading JSONL files line by line; the default (the
+# filesystem block size, often 4-8 KB) makes line iteration about twice
+# as slow on multi-MB files
+READ_BUFFER_SIZE = 128 * 1024
+
+_FROMISOFORMAT_ACCEPTS_Z = sys.version_info >= (3, 11)
+
+# Month names as strftime's '%b' gives them in the C locale the scripts run in
+_MONTH_ABBR = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+               'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+# Time query patterns, equivalent to the strptime formats '%I:%M%p',
+# '%I:%M %p', '%I%p', '%I %p' and '%H:%M' (same field ranges) but matched
+# in one step instead of trying each format in turn
+_TIME_12H_RE = re.compile(r'(1[0-2]|0[1-9]|[1-9])(?::([0-5]\d|\d))?\s*(am|pm)')
+_TIME_24H_RE = re.compile(r'(2[0-3]|[0-1]\d|\d):([0-5]\d|\d)')
+
+# Date patterns tried by parse_date_time_query, each with the function
+# that turns its first group into a month number (None if it is not one)
+_MONTH_NUMBERS = {name.lower(): number for number, name in enumerate(_MONTH_ABBR, start=1)}
+_DATE_PATTERNS = (
+    (re.compile(r'(\w{3})\s+(\d{1,2})'), _MONTH_NUMBERS.get),  # jan 5
+    (re.compile(r'(\d{1,2})/(\d{1,2})'), int),                  # 1/5
+)
+
+
+# JSON codec: orjson parses/serializes in C when installed, stdlib otherwise.
+# orjson takes several ms to import, more than it saves on the few KB a
+# typical hook run handles, so it is only imported once an input of at
+# least FAST_JSON_MIN_BYTES comes along (see json_loader).
+# json_loads accepts str or bytes; json_dumps always returns UTF-8 bytes.
+# pretty=False produces single-line output suitable for JSONL records.
+FAST_JSON_MIN_BYTES = 1 << 20
+
+_orjson = None  # orjson module once imported; False if it is not installed
+
+
+def _import_orjson():
+    """Import orjson on first use; returns None if it is not installed."""
+    global _orjson
+    if _orjson is None:
+        try:
+            import orjson
+        except ImportError:
+            orjson = False
+        _orjson = orjson
+    return _orjson or None
+
+
+def json_loader(size: int) -> Callable[[Any], Any]:
+    """Return the JSON parser to use for an input of about size bytes."""
+    if size >= FAST_JSON_MIN_BYTES:
+        fast = _import_orjson()
+        if fast is not None:
+            return fast.loads
+    return json_loads
+
+
+def json_loads(data: Any) -> Any:
+    """Parse JSON, using orjson if it has already been imported."""
+    if _orjson:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(obj: Any, pretty: bool = True) -> bytes:
+    """Serialize obj to JSON bytes, using orjson if it has already been imported."""
+    if _orjson:
+        return _orjson.dumps(obj, option=_orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(obj, indent=2).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
 
 
 def extract_text_content(message: Dict[str, Any]) -> str:
@@ -35,18 +121,38 @@ def extract_text_content(message: Dict[str, Any]) -> str:
     if isinstance(content, str):
         return content
 
-    text_parts = []
-    for item in content:
-        if isinstance(item, dict) and item.get('type') == 'text':
-            text_parts.append(item.get('text', ''))
-        elif isinstance(item, str):
-            text_parts.append(item)
+    # Fast path: most messages carry a single block. Decoded JSON holds
+    # exact list/dict types, so the cheaper type() identity checks suffice.
+    if type(content) is list and len(content) == 1:
+        item = content[0]
+        if type(item) is dict:
+            return item.get('text', '') if item.get('type') == 'text' else ''
+        return item if isinstance(item, str) else ''
 
-    return '\n'.join(text_parts)
+    # One comprehension for mixed blocks (text, tool_use, ...); join needs
+    # a list anyway, so a generator would only add overhead
+    return '\n'.join([
+        item.get('text', '') if type(item) is dict else item
+        for item in content
+        if (item.get('type') == 'text' if type(item) is dict else isinstance(item, str))
+    ])
 
 
 def make_preview(text: str, max_length: int = PREVIEW_LENGTH) -> str:
     """Create a short preview of text for the index."""
+    # Fast path: short text with no whitespace runs to collapse
+    if (len(text) <= max_length and text.isprintable() and '  ' not in text
+            and text[:1] != ' ' and text[-1:] != ' '):
+        return text
+
+    # Long text: normalizing a head slice is enough when it alone yields
+    # more than max_length + 1 characters, so the rest is never scanned
+    if len(text) > max_length * 4:
+        head = ' '.join(text[:max_length * 4].split())
+        if len(head) > max_length + 1:
+            return head[:max_length - 3] + '...'
+
+    # Collapse whitespace runs and strip the ends in one C pass
     text = ' '.join(text.split())
     if len(text) <= max_length:
         return text
@@ -57,34 +163,39 @@ def truncate_text(text: str, max_chars: int = MAX_CHARS_PER_MESSAGE) -> str:
     """Truncate text to max_chars, adding indicator if truncated."""
     if len(text) <= max_chars:
         return text
-    return text[:max_chars] + "\n\n[...truncated...]"
+    return text[:max_chars] + TRUNCATION_MARKER
+
 
+def _normalize_time_query(time_str: str) -> str:
+    """Lowercase and strip a time query, dropping a leading 'around '."""
+    time_str = time_str.lower().strip()
+    # Plain string checks; no need for the regex engine here
+    if time_str.startswith('around') and time_str[6:7].isspace():
+        time_str = time_str[6:].lstrip()
+    return time_str
 
-def parse_time_query(time_str: str) -> Optional[datetime]:
+
+def parse_time_query(time_str: str, now: Optional[datetime] = None) -> Optional[datetime]:
     """Parse a time query like '2:30pm', '14:30', 'around 3pm'.
 
-    Returns a datetime with today's date and the parsed time.
+    Returns a datetime with today's date (taken from now, if given) and
+    the parsed time.
     """
-    time_str = time_str.lower().strip()
-    time_str = re.sub(r'^around\s+', '', time_str)
-
-    formats = [
-        "%I:%M%p",   # 2:30pm
-        "%I:%M %p",  # 2:30 pm
-        "%I%p",      # 2pm
-        "%I %p",     # 2 pm
-        "%H:%M",     # 14:30
-    ]
+    time_str = _normalize_time_query(time_str)
 
-    for fmt in formats:
-        try:
-            parsed = datetime.strptime(time_str, fmt)
-            today = datetime.now()
-            return parsed.replace(year=today.year, month=today.month, day=today.day)
-        except ValueError:
-            continue
+    match = _TIME_12H_RE.fullmatch(time_str)
+    if match:
+        hour_str, minute_str, ampm = match.groups()
+        hour = int(hour_str) % 12 + (12 if ampm == 'pm' else 0)
+    else:
+        match = _TIME_24H_RE.fullmatch(time_str)
+        if not match:
+            return None
+        hour_str, minute_str = match.groups()
+        hour = int(hour_str)
 
-    return None
+    today = now or datetime.now()
+    return datetime(today.year, today.month, today.day, hour, int(minute_str or 0))
 
 
 def parse_date_time_query(time_str: str, reference_dates: List[str] = None) -> Optional[Tuple[datetime, Optional[str]]]:
@@ -97,40 +208,39 @@ def parse_date_time_query(time_str: str, reference_dates: List[str] = None) -> O
     Returns:
         Tuple of (datetime, matched_date_str) or None if parsing fails
     """
-    time_str = time_str.lower().strip()
-    time_str = re.sub(r'^around\s+', '', time_str)
+    time_str = _normalize_time_query(time_str)
+
+    # Read the clock once for both the date keywords and the time itself
+    now = datetime.now()
+    today = now.date()
 
     # Check for relative date keywords
     target_date = None
     if 'yesterday' in time_str:
-        target_date = datetime.now().date() - __import__('datetime').timedelta(days=1)
+        target_date = today - timedelta(days=1)
         time_str = time_str.replace('yesterday', '').strip()
     elif 'today' in time_str:
-        target_date = datetime.now().date()
+        target_date = today
         time_str = time_str.replace('today', '').strip()
 
     # Check for date patterns like "jan 5" or "1/5"
-    date_patterns = [
-        (r'(\w{3})\s+(\d{1,2})', '%b %d'),  # jan 5
-        (r'(\d{1,2})/(\d{1,2})', '%m/%d'),   # 1/5
-    ]
-
-    current_year = datetime.now().year
-    for pattern, date_fmt in date_patterns:
-        match = re.search(pattern, time_str)
+    for pattern, month_number in _DATE_PATTERNS:
+        match = pattern.search(time_str)
         if match:
+            month_str, day_str = match.groups()
+            month = month_number(month_str)
+            if month is None:
+                continue
             try:
-                date_str = match.group(0)
-                # Add year to avoid Python 3.15 deprecation warning
-                parsed_date = datetime.strptime(f"{date_str} {current_year}", f"{date_fmt} %Y")
-                target_date = parsed_date.date()
-                time_str = time_str.replace(date_str, '').strip()
-                break
+                # Validates the day for this year's month, as strptime did
+                target_date = date(today.year, month, int(day_str))
             except ValueError:
                 continue
+            time_str = time_str.replace(match.group(0), '').strip()
+            break
 
     # Parse the time portion
-    parsed_time = parse_time_query(time_str)
+    parsed_time = parse_time_query(time_str, now)
     if not parsed_time:
         return None
 
@@ -142,75 +252,226 @@ def parse_date_time_query(time_str: str, reference_dates: List[str] = None) -> O
     return (parsed_time, None)
 
 
-def format_timestamp(iso_timestamp: str) -> str:
-    """Format ISO timestamp as human-readable time (e.g., '2:30 pm')."""
-    if not iso_timestamp:
-        return ""
+def parse_timestamp(iso_timestamp: Any) -> Optional[datetime]:
+    """Parse an ISO timestamp ('Z' or offset suffix), or None if invalid."""
+    if not iso_timestamp or not isinstance(iso_timestamp, str):
+        return None
+    return _parse_iso_timestamp(iso_timestamp)
+
 
+@lru_cache(maxsize=None)
+def _parse_iso_timestamp(iso_timestamp: str) -> Optional[datetime]:
+    """Cached parser behind parse_timestamp.
+
+    Pagination, search and time lookups parse the same timestamps many
+    times within a run.
+    """
+    # fromisoformat accepts a 'Z' suffix itself from Python 3.11
+    if not _FROMISOFORMAT_ACCEPTS_Z and iso_timestamp.endswith('Z'):
+        iso_timestamp = iso_timestamp[:-1] + '+00:00'
     try:
-        dt = datetime.fromisoformat(iso_timestamp.replace('Z', '+00:00'))
-        local_dt = dt.astimezone()
-        return local_dt.strftime("%-I:%M %p").lower()
-    except Exception:
+        return datetime.fromisoformat(iso_timestamp)
+    except ValueError:
+        return None
+
+
+def _local_time(iso_timestamp: str) -> Optional[datetime]:
+    """Return the timestamp converted to local time, or None if invalid."""
+    if not iso_timestamp or not isinstance(iso_timestamp, str):
+        return None
+    return _local_time_cached(iso_timestamp)
+
+
+@lru_cache(maxsize=None)
+def _local_time_cached(iso_timestamp: str) -> Optional[datetime]:
+    """Cached local-time conversion behind _local_time.
+
+    astimezone() looks up the local zone on every call; pages and search
+    results format each timestamp more than once. Caching per timestamp
+    (rather than fixing one UTC offset) keeps DST transitions correct.
+    """
+    dt = _parse_iso_timestamp(iso_timestamp)
+    return dt.astimezone() if dt is not None else None
+
+
+def _clock_time(dt: datetime) -> Tuple[str, str]:
+    """Return dt's 12-hour clock time (e.g. '2:30') and its 'AM'/'PM' suffix.
+
+    Building the strings directly is several times faster than strftime,
+    and also avoids the glibc-only '%-I' directive.
+    """
+    hour = dt.hour
+    return f"{hour % 12 or 12}:{dt.minute:02d}", 'AM' if hour < 12 else 'PM'
+
+
+def format_timestamp(iso_timestamp: str) -> str:
+    """Format ISO timestamp as human-readable time (e.g., '2:30 pm')."""
+    local_dt = _local_time(iso_timestamp)
+    if local_dt is None:
         return ""
+    clock, period = _clock_time(local_dt)
+    return f"{clock} {period.lower()}"
 
 
 def format_date(iso_timestamp: str) -> str:
     """Format ISO timestamp as human-readable date (e.g., 'Jan 5, 2026 at 2:30 PM')."""
-    if not iso_timestamp:
-        return "Unknown date"
-
-    try:
-        dt = datetime.fromisoformat(iso_timestamp.replace('Z', '+00:00'))
-        local_dt = dt.astimezone()
-        return local_dt.strftime("%b %d, %Y at %-I:%M %p")
-    except Exception:
+    local_dt = _local_time(iso_timestamp)
+    if local_dt is None:
         return "Unknown date"
+    clock, period = _clock_time(local_dt)
+    month = _MONTH_ABBR[local_dt.month - 1]
+    return f"{month} {local_dt.day:02d}, {local_dt.year} at {clock} {period}"
 
 
 def format_short_date(iso_timestamp: str) -> str:
     """Format ISO timestamp as short date (e.g., 'Jan 5')."""
-    if not iso_timestamp:
-        return ""
-
-    try:
-        dt = datetime.fromisoformat(iso_timestamp.replace('Z', '+00:00'))
-        local_dt = dt.astimezone()
-        return local_dt.strftime("%b %-d")
-    except Exception:
+    local_dt = _local_time(iso_timestamp)
+    if local_dt is None:
         return ""
+    return f"{_MONTH_ABBR[local_dt.month - 1]} {local_dt.day}"
 
 
 def get_date_from_timestamp(iso_timestamp: str) -> Optional[str]:
     """Extract just the date portion from an ISO timestamp."""
-    if not iso_timestamp:
-        return None
+    return _timestamp_parts(iso_timestamp)[0]
+
+
+def load_index_header() -> Optional[Dict]:
+    """Load the index header (session metadata and offsets) from disk.
+
+    Returns None if the header is missing or unreadable.
+    """
     try:
-        dt = datetime.fromisoformat(iso_timestamp.replace('Z', '+00:00'))
-        return dt.date().isoformat()
+        # Decode from bytes in one call, skipping the text-mode layer
+        return json_loads(INDEX_FILE.read_bytes())
     except Exception:
         return None
 
 
-def load_index() -> Optional[Dict]:
-    """Load the conversation index from disk."""
-    if not INDEX_FILE.exists():
-        return None
+def exchange_to_row(exchange: Dict) -> List[Any]:
+    """Convert an exchange dict to its compact exchange log row.
+
+    Rows are JSON arrays in EXCHANGE_FIELDS order, so key names are not
+    repeated on every line. The exchange number is the row's line number
+    in the log and is not stored.
+    """
+    return [exchange.get(field, '') for field in EXCHANGE_FIELDS]
+
+
+def row_to_exchange(row: Any, idx: int) -> Dict:
+    """Convert an exchange log row back to an exchange dict.
+
+    Logs written before rows were compacted hold one dict per line; those
+    are returned unchanged.
+    """
+    if isinstance(row, dict):
+        return row
+    exchange = dict(zip(EXCHANGE_FIELDS, row))
+    exchange['idx'] = idx
+    return exchange
+
+
+def iter_exchanges(index: Dict) -> Iterator[Dict]:
+    """Yield exchanges lazily from the exchange log, in index order.
+
+    Older single-file indexes keep exchanges inline; those are yielded as-is.
+    Lines past the header's recorded size belong to an append that has not
+    been committed to the header yet, so they are ignored.
+    """
+    if 'exchanges' in index:
+        for ex in index['exchanges']:
+            yield ex
+        return
+
+    limit = index.get('_exchanges_size', 0)
+    consumed = 0
+    loads = json_loader(limit)
 
     try:
-        with open(INDEX_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except Exception:
-        return None
+        with open(EXCHANGES_FILE, 'rb', buffering=READ_BUFFER_SIZE) as f:
+            for idx, line in enumerate(f, start=1):
+                consumed += len(line)
+                if consumed > limit:
+                    break
+                try:
+                    yield row_to_exchange(loads(line), idx)
+                except json.JSONDecodeError:
+                    continue
+    except OSError:
+        return
+
+
+def read_tail_lines(path: Path, n: int, end: Optional[int] = None) -> List[bytes]:
+    """Return the last n lines of a file, without their newlines.
+
+    The file is memory-mapped and scanned backwards from `end` (default:
+    end of file) with rfind, so only the pages holding those lines are
+    touched and the cost depends on n rather than on the size of the file.
+    """
+    if n <= 0:
+        return []
+
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        end = size if end is None else min(end, size)
+        if end <= 0:
+            # mmap can't map an empty file
+            return []
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            stop = end - 1 if mm[end - 1] == 0x0A else end
+            cursor = stop
+            for _ in range(n):
+                cursor = mm.rfind(b'\n', 0, cursor)
+                if cursor < 0:
+                    break
+            data = mm[cursor + 1:stop]
+
+    return data.split(b'\n')
+
+
+def tail_exchanges(index: Dict, n: int) -> List[Dict]:
+    """Return the last n exchanges, reading only the end of the exchange log."""
+    if n <= 0:
+        return []
+    if 'exchanges' in index:
+        return index['exchanges'][-n:]
+
+    try:
+        lines = read_tail_lines(EXCHANGES_FILE, n, index.get('_exchanges_size', 0))
+    except OSError:
+        return []
+
+    first_idx = index.get('total_exchanges', len(lines)) - len(lines) + 1
+    exchanges = []
+    for offset, line in enumerate(lines):
+        try:
+            exchanges.append(row_to_exchange(json_loads(line), first_idx + offset))
+        except json.JSONDecodeError:
+            continue
+    return exchanges
+
+
+def load_index() -> Optional[Dict]:
+    """Load the conversation index from disk, including all exchanges."""
+    index = load_index_header()
+    if index is not None and 'exchanges' not in index:
+        index['exchanges'] = list(iter_exchanges(index))
+    return index
 
 
 def save_index(index_data: Dict) -> bool:
-    """Save the conversation index to disk."""
+    """Save the conversation index to disk.
+
+    Writes to a temp file and renames it over INDEX_FILE, so readers never
+    see a partially written index.
+    """
     INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_file = INDEX_FILE.with_suffix('.json.tmp')
 
     try:
-        with open(INDEX_FILE, 'w', encoding='utf-8') as f:
-            json.dump(index_data, f, indent=2)
+        tmp_file.write_bytes(json_dumps(index_data, pretty=PRETTY_INDEX))
+        os.replace(tmp_file, INDEX_FILE)
         return True
     except Exception:
         return False
@@ -227,65 +488,122 @@ def parse_transcript_messages(transcript_path: str) -> List[Dict[str, Any]]:
         return messages
 
     try:
-        with open(transcript_path, 'r', encoding='utf-8') as f:
+        with open(transcript_path, 'rb', buffering=READ_BUFFER_SIZE) as f:
+            loads = json_loader(os.fstat(f.fileno()).st_size)
             for line in f:
-                line = line.strip()
-                if not line:
+                # Skip tool results and system events without a full parse.
+                # Blank lines never pass this, and the JSON parser accepts
+                # the trailing newline, so lines are not stripped first.
+                if b'"user"' not in line and b'"assistant"' not in line:
                     continue
+
                 try:
-                    entry = json.loads(line)
-                    role = entry.get('type', '') or entry.get('role', '')
-                    if role not in ('user', 'assistant'):
-                        message_obj = entry.get('message', {})
-                        role = message_obj.get('role', '')
-
-                    if role in ('user', 'assistant'):
-                        message_obj = entry.get('message', {})
-                        text = extract_text_content(message_obj)
-                        timestamp = entry.get('timestamp', '')
-
-                        if text:
-                            messages.append({
-                                'role': role,
-                                'text': text,
-                                'timestamp': timestamp
-                            })
+                    entry = loads(line)
                 except json.JSONDecodeError:
                     continue
+
+                # A stray non-object line is skipped rather than ending the parse
+                if not isinstance(entry, dict):
+                    continue
+                message_obj = entry.get('message', {})
+                if not isinstance(message_obj, dict):
+                    continue
+
+                role = entry.get('type', '') or entry.get('role', '')
+                if role not in ('user', 'assistant'):
+                    role = message_obj.get('role', '')
+
+                if role in ('user', 'assistant'):
+                    text = extract_text_content(message_obj)
+                    if text:
+                        messages.append({
+                            'role': role,
+                            'text': text,
+                            'timestamp': entry.get('timestamp', '')
+                        })
     except Exception:
         pass
 
     return messages
 
 
+def pair_messages(messages: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Dict, Dict]]:
+    """Yield (user message, assistant message) for each adjacent pair.
+
+    A user message pairs with the message right after it if that is an
+    assistant message; both are then consumed. One pass, no indexing.
+    """
+    pending_user = None
+    for msg in messages:
+        role = msg['role']
+        if role == 'user':
+            pending_user = msg
+        else:
+            if role == 'assistant' and pending_user is not None:
+                yield pending_user, msg
+            pending_user = None
+
+
 def build_exchanges_from_messages(messages: List[Dict[str, Any]]) -> List[Dict]:
     """Build list of exchanges from parsed messages.
 
     Returns list of dicts with keys: idx, user_text, assistant_text, timestamp
     """
-    exchanges = []
-    i = 0
-    exchange_idx = 1
-
-    while i < len(messages):
-        if messages[i]['role'] == 'user':
-            user_msg = messages[i]
-            if i + 1 < len(messages) and messages[i + 1]['role'] == 'assistant':
-                assistant_msg = messages[i + 1]
-                exchanges.append({
-                    'idx': exchange_idx,
-                    'user_text': user_msg['text'],
-                    'assistant_text': assistant_msg['text'],
-                    'timestamp': user_msg.get('timestamp', '')
-                })
-                exchange_idx += 1
-                i += 2
-            else:
-                i += 1
-        else:
-            i += 1
+    return [
+        {
+            'idx': exchange_idx,
+            'user_text': user_msg['text'],
+            'assistant_text': assistant_msg['text'],
+            'timestamp': user_msg.get('timestamp', '')
+        }
+        for exchange_idx, (user_msg, assistant_msg) in enumerate(pair_messages(messages), start=1)
+    ]
+
+
+def _timestamp_parts(iso_timestamp: str) -> Tuple[Optional[str], Optional[int]]:
+    """Return (ISO date, minutes since midnight) for a timestamp, or Nones."""
+    if not iso_timestamp or not isinstance(iso_timestamp, str):
+        return None, None
+    return _timestamp_parts_cached(iso_timestamp)
+
+
+@lru_cache(maxsize=None)
+def _timestamp_parts_cached(iso_timestamp: str) -> Tuple[Optional[str], Optional[int]]:
+    """Cached computation behind _timestamp_parts.
+
+    Date grouping, session date ranges and time lookups each ask for the
+    same timestamps' dates within a run.
+    """
+    ex_time = _parse_iso_timestamp(iso_timestamp)
+    if ex_time is None:
+        return None, None
+    minutes = ex_time.hour * 60 + ex_time.minute
+    # A valid 'YYYY-MM-DD...' timestamp already starts with its ISO date
+    if iso_timestamp[4:5] == '-' and iso_timestamp[7:8] == '-' and iso_timestamp[5:7].isdigit():
+        return iso_timestamp[:10], minutes
+    return ex_time.date().isoformat(), minutes
 
-    return exchanges
+
+def exchange_minutes(exchanges: List[Dict]) -> List[Optional[int]]:
+    """Return minutes since midnight for each exchange (None if unparseable).
+
+    Compute this once per loaded index and pass it to closest_position
+    rather than re-reading timestamps for every lookup.
+    """
+    return [_timestamp_parts(ex.get('timestamp', ''))[1] for ex in exchanges]
+
+
+def closest_position(minutes: Sequence[Optional[int]], target: int) -> int:
+    """Return the position whose minutes value is closest to target.
+
+    Ties go to the earliest position. Every position is compared: minutes
+    are not guaranteed to rise, e.g. with mixed UTC offsets on one date.
+    """
+    # (diff, position) pairs order ties by position; min() runs in C
+    return min(
+        ((abs(m - target), i) for i, m in enumerate(minutes) if m is not None),
+        default=(0, 0)
+    )[1]
 
 
 def find_exchanges_by_time(
@@ -308,58 +626,42 @@ def find_exchanges_by_time(
     if not exchanges:
         return []
 
-    # If target_date specified, filter to that date first
+    target_minutes = target_time.hour * 60 + target_time.minute
+    # Parse each timestamp once into parallel date and minute columns
+    dates, minutes = zip(*[_timestamp_parts(ex.get('timestamp', '')) for ex in exchanges])
+
+    # If target_date specified, narrow to that date first
+    candidates = range(len(exchanges))
     if target_date:
-        date_matches = [
-            (i, ex) for i, ex in enumerate(exchanges)
-            if get_date_from_timestamp(ex.get('timestamp', '')) == target_date
-        ]
-        if not date_matches:
-            # No exact date match, fall back to time-only matching
-            pass
-        else:
-            # Find closest time within that date
-            best_idx = 0
-            best_diff = float('inf')
+        date_matches = [i for i, ex_date in enumerate(dates) if ex_date == target_date]
+        # No exact date match falls back to time-only matching
+        if date_matches:
+            candidates = date_matches
+            minutes = [minutes[i] for i in date_matches]
 
-            for list_idx, (orig_idx, ex) in enumerate(date_matches):
-                try:
-                    ex_time = datetime.fromisoformat(ex['timestamp'].replace('Z', '+00:00'))
-                    ex_minutes = ex_time.hour * 60 + ex_time.minute
-                    target_minutes = target_time.hour * 60 + target_time.minute
-                    diff = abs(ex_minutes - target_minutes)
-                    if diff < best_diff:
-                        best_diff = diff
-                        best_idx = list_idx
-                except Exception:
-                    continue
+    best_idx = closest_position(minutes, target_minutes)
 
-            # Return window around the match within date_matches
-            start = max(0, best_idx - window // 2)
-            end = min(len(date_matches), best_idx + window // 2 + 1)
-            return [date_matches[i][1]['idx'] for i in range(start, end)]
+    start = max(0, best_idx - window // 2)
+    end = min(len(candidates), best_idx + window // 2 + 1)
+    return [exchanges[candidates[i]]['idx'] for i in range(start, end)]
 
-    # Time-only matching (original behavior)
-    best_idx = 0
-    best_diff = float('inf')
 
-    for i, ex in enumerate(exchanges):
-        try:
-            ex_time = datetime.fromisoformat(ex['timestamp'].replace('Z', '+00:00'))
-            ex_minutes = ex_time.hour * 60 + ex_time.minute
-            target_minutes = target_time.hour * 60 + target_time.minute
-            diff = abs(ex_minutes - target_minutes)
-            if diff < best_diff:
-                best_diff = diff
-                best_idx = i
-        except Exception:
-            continue
+def make_text_matcher(keyword: str) -> Callable[[str], bool]:
+    """Return a case-insensitive test for whether text contains keyword.
 
-    start = max(0, best_idx - window // 2)
-    end = min(len(exchanges), best_idx + window // 2 + 1)
-    return [exchanges[i]['idx'] for i in range(start, end)]
+    The text is lowercased once and checked with a plain substring test.
+    Search paths build one matcher and apply it to each exchange field.
+    """
+    keyword = keyword.lower()
+
+    # Keywords of only ASCII digits, punctuation and spaces (error codes,
+    # ports, paths) have no case, and lowercasing never turns other text
+    # into those characters, so such searches skip the lowercase copy
+    if keyword.isascii() and not any(c.isalpha() for c in keyword):
+        return lambda text: keyword in text
+    return lambda text: keyword in text.lower()
 
 
 def search_in_text(text: str, keyword: str) -> bool:
     """Check if keyword exists in text (case-insensitive)."""
-    return keyword.lower() in text.lower()
+    return make_text_matcher(keyword)(text)
@@ -3,15 +3,18 @@
 
 import json
 import os
+import shutil
 import sys
 import tempfile
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
 # Add scripts directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'scripts'))
 
 from extract_context import load_snapshot, format_exchanges_as_markdown
+import utils
 
 
 class TestLoadSnapshot(unittest.TestCase):
@@ -20,59 +23,55 @@ class TestLoadSnapshot(unittest.TestCase):
     def setUp(self):
         """Set up test fixtures."""
         self.temp_dir = tempfile.mkdtemp()
-        self.snapshot_dir = Path(self.temp_dir) / '.claude' / 'context-recall'
-        self.snapshot_dir.mkdir(parents=True)
+        self.index_file = Path(self.temp_dir) / 'index.json'
+        self.log_file = Path(self.temp_dir) / 'index.jsonl'
+        self.patches = [
+            patch.object(utils, 'INDEX_FILE', self.index_file),
+            patch.object(utils, 'EXCHANGES_FILE', self.log_file),
+        ]
+        for p in self.patches:
+            p.start()
 
     def tearDown(self):
         """Clean up test fixtures."""
-        import shutil
+        for p in self.patches:
+            p.stop()
         shutil.rmtree(self.temp_dir, ignore_errors=True)
 
-    def test_load_valid_snapshot(self):
-        """Test loading a valid snapshot file."""
-        from unittest.mock import patch
-
-        snapshot_data = {
-            'session_id': 'test-123',
-            'timestamp': '2025-01-04T12:00:00Z',
-            'message_count': 10,
-            'exchanges': [
-                {'user': 'Hello', 'assistant': 'Hi there!'}
-            ]
-        }
+    def _write_index(self, count):
+        """Write an index header and a log holding count exchanges."""
+        log = ''.join(
+            json.dumps([f'q{i}', '2025-01-04T12:00:00Z', f'q{i}', f'a{i}']) + '\n'
+            for i in range(1, count + 1)
+        )
+        self.log_file.write_text(log)
+        with open(self.index_file, 'w') as f:
+            json.dump({
+                'session_id': 'test-123',
+                'updated_at': '2025-01-04T12:00:00Z',
+                'total_exchanges': count,
+                '_exchanges_size': len(log.encode()),
+            }, f)
 
-        snapshot_file = self.snapshot_dir / 'current.json'
-        with open(snapshot_file, 'w') as f:
-            json.dump(snapshot_data, f)
+    def test_load_valid_snapshot(self):
+        """Test loading keeps only the most recent exchanges."""
+        self._write_index(7)
 
-        with patch.object(Path, 'home', return_value=Path(self.temp_dir)):
-            result = load_snapshot()
+        result = load_snapshot()
 
         self.assertEqual(result['session_id'], 'test-123')
-        self.assertEqual(len(result['exchanges']), 1)
+        self.assertEqual([ex['idx'] for ex in result['exchanges']], [3, 4, 5, 6, 7])
+        self.assertEqual(result['exchanges'][-1]['assistant_text'], 'a7')
 
     def test_load_missing_snapshot(self):
-        """Test loading when snapshot file doesn't exist."""
-        from unittest.mock import patch
-
-        with patch.object(Path, 'home', return_value=Path(self.temp_dir)):
-            # Remove the current.json file
-            result = load_snapshot()
-
-        self.assertEqual(result, {})
+        """Test loading when the index doesn't exist."""
+        self.assertEqual(load_snapshot(), {})
 
     def test_load_invalid_json(self):
-        """Test loading when snapshot contains invalid JSON."""
-        from unittest.mock import patch
-
-        snapshot_file = self.snapshot_dir / 'current.json'
-        with open(snapshot_file, 'w') as f:
-            f.write('not valid json')
-
-        with patch.object(Path, 'home', return_value=Path(self.temp_dir)):
-            result = load_snapshot()
+        """Test loading when the index header contains invalid JSON."""
+        self.index_file.write_text('not valid json')
 
-        self.assertEqual(result, {})
+        self.assertEqual(load_snapshot(), {})
 
 
 class TestFormatExchangesAsMarkdown(unittest.TestCase):
@@ -86,7 +85,7 @@ class TestFormatExchangesAsMarkdown(unittest.TestCase):
     def test_single_exchange(self):
         """Test formatting a single exchange."""
         exchanges = [
-            {'user': 'Hello', 'assistant': 'Hi there!'}
+            {'idx': 1, 'user_text': 'Hello', 'assistant_text': 'Hi there!'}
         ]
         result = format_exchanges_as_markdown(exchanges)
 
@@ -97,8 +96,8 @@ class TestFormatExchangesAsMarkdown(unittest.TestCase):
     def test_multiple_exchanges(self):
         """Test formatting multiple exchanges."""
         exchanges = [
-            {'user': 'First question', 'assistant': 'First answer'},
-            {'user': 'Second question', 'assistant': 'Second answer'},
+            {'idx': 1, 'user_text': 'First question', 'assistant_text': 'First answer'},
+            {'idx': 2, 'user_text': 'Second question', 'assistant_text': 'Second answer'},
         ]
         result = format_exchanges_as_markdown(exchanges)
 
@@ -115,7 +114,7 @@ class TestFormatExchangesAsMarkdown(unittest.TestCase):
         """
         truncated_text = 'x' * 1000 + '\n\n[...truncated...]'
         exchanges = [
-            {'user': truncated_text, 'assistant': 'Short response'}
+            {'idx': 1, 'user_text': truncated_text, 'assistant_text': 'Short response'}
         ]
         result = format_exchanges_as_markdown(exchanges)
 
@@ -125,8 +124,8 @@ class TestFormatExchangesAsMarkdown(unittest.TestCase):
     def test_handles_missing_fields(self):
         """Test handling of exchanges with missing fields."""
         exchanges = [
-            {'user': 'Hello'},  # Missing assistant
-            {'assistant': 'Response'},  # Missing user
+            {'idx': 1, 'user_text': 'Hello'},  # Missing assistant
+            {'idx': 2, 'assistant_text': 'Response'},  # Missing user
         ]
         result = format_exchanges_as_markdown(exchanges)
 
@@ -97,7 +97,6 @@ class TestSearchExchangesFullContent(unittest.TestCase):
         result = search_exchanges_full_content(exchanges, 'authentication')
         self.assertEqual(result, {1})
 
-
 class TestFormatExchanges(unittest.TestCase):
     """Tests for format_exchanges function."""
 
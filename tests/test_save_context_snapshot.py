@@ -3,10 +3,13 @@
 
 import json
 import os
+import shutil
+import subprocess
 import sys
 import tempfile
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
 # Add hooks and scripts directories to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'hooks'))
@@ -16,9 +19,15 @@ from save_context_snapshot import (
     get_transcript_size,
     parse_transcript_from_offset,
     build_new_exchanges,
+    parse_new_exchanges,
     load_existing_index,
     save_index,
+    get_cursor_file,
+    append_exchanges,
+    run_hook,
 )
+import save_context_snapshot
+import utils
 from utils import (
     extract_text_content,
     make_preview,
@@ -100,7 +109,6 @@ class TestParseTranscriptFromOffset(unittest.TestCase):
 
     def tearDown(self):
         """Clean up test fixtures."""
-        import shutil
         shutil.rmtree(self.temp_dir, ignore_errors=True)
 
     def test_valid_transcript(self):
@@ -128,6 +136,21 @@ class TestParseTranscriptFromOffset(unittest.TestCase):
         self.assertEqual(result[0]['timestamp'], '2025-01-05T09:00:00Z')
         self.assertGreater(offset, 0)
 
+    def test_partial_last_line_left_for_next_run(self):
+        """Test a half-written last line is parsed once it is complete."""
+        first = json.dumps({'type': 'user', 'message': {'content': 'Hello'}}) + '\n'
+        second = json.dumps({'type': 'assistant', 'message': {'content': 'Hi there!'}}) + '\n'
+        self.transcript_file.write_text(first + second[:20])
+
+        result, offset = parse_transcript_from_offset(str(self.transcript_file))
+        self.assertEqual([m['text'] for m in result], ['Hello'])
+        self.assertEqual(offset, len(first))
+
+        self.transcript_file.write_text(first + second)
+        result, offset = parse_transcript_from_offset(str(self.transcript_file), offset)
+        self.assertEqual([m['text'] for m in result], ['Hi there!'])
+        self.assertEqual(offset, len(first) + len(second))
+
     def test_empty_path(self):
         """Test with empty path."""
         result, offset = parse_transcript_from_offset('')
@@ -158,6 +181,129 @@ class TestTruncateText(unittest.TestCase):
         self.assertIn('[...truncated...]', result)
 
 
+class TestParseNewExchanges(unittest.TestCase):
+    """Tests for parse_new_exchanges function."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.transcript_file = Path(self.temp_dir) / 'transcript.jsonl'
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_valid_transcript(self):
+        """Test parsing a valid transcript file."""
+        lines = [
+            json.dumps({
+                'type': 'user',
+                'message': {'content': [{'type': 'text', 'text': 'Hello'}]},
+                'timestamp': '2025-01-05T09:00:00Z'
+            }),
+            json.dumps({
+                'type': 'assistant',
+                'message': {'content': [{'type': 'text', 'text': 'Hi there!'}]},
+                'timestamp': '2025-01-05T09:00:05Z'
+            }),
+        ]
+        with open(self.transcript_file, 'w') as f:
+            f.write('\n'.join(lines))
+
+        exchanges, offset = parse_new_exchanges(str(self.transcript_file))
+
+        self.assertEqual(len(exchanges), 1)
+        self.assertEqual(exchanges[0]['idx'], 1)
+        self.assertEqual(exchanges[0]['user_text'], 'Hello')
+        self.assertEqual(exchanges[0]['assistant_text'], 'Hi there!')
+        self.assertEqual(exchanges[0]['timestamp'], '2025-01-05T09:00:00Z')
+        self.assertEqual(offset, self.transcript_file.stat().st_size)
+
+    def test_partial_last_line_left_for_next_run(self):
+        """Test a half-written last line is parsed once it is complete."""
+        def line(entry_type, text):
+            return json.dumps({'type': entry_type, 'message': {'content': text}}) + '\n'
+
+        complete = line('user', 'Hello') + line('assistant', 'Hi there!')
+        question = line('user', 'Second question')
+        self.transcript_file.write_text(complete + question[:20])
+
+        exchanges, offset = parse_new_exchanges(str(self.transcript_file))
+        self.assertEqual([ex['user_text'] for ex in exchanges], ['Hello'])
+        self.assertEqual(offset, len(complete))
+
+        self.transcript_file.write_text(complete + question + line('assistant', 'Answer'))
+        exchanges, offset = parse_new_exchanges(str(self.transcript_file), offset, 2)
+        self.assertEqual([(ex['idx'], ex['user_text'], ex['assistant_text']) for ex in exchanges],
+                         [(2, 'Second question', 'Answer')])
+        self.assertEqual(offset, self.transcript_file.stat().st_size)
+
+    def test_empty_path(self):
+        """Test with empty path."""
+        exchanges, offset = parse_new_exchanges('')
+        self.assertEqual(exchanges, [])
+        self.assertEqual(offset, 0)
+
+    def test_nonexistent_file(self):
+        """Test with non-existent file."""
+        exchanges, offset = parse_new_exchanges('/nonexistent/file.jsonl', 5)
+        self.assertEqual(exchanges, [])
+        self.assertEqual(offset, 5)
+
+    def test_tool_steps_between_messages(self):
+        """Test tool steps and tool results don't break exchange pairing."""
+        entries = [
+            {'type': 'user', 'message': {'content': 'First'}, 'timestamp': 't1'},
+            {'type': 'assistant', 'message': {'content': [{'type': 'tool_use'}]}},
+            {'type': 'user', 'message': {'content': [{'type': 'tool_result', 'content': 'x'}]}},
+            {'type': 'assistant', 'message': {'content': 'Reply one'}},
+            {'type': 'assistant', 'message': {'content': 'Follow-up step'}},
+            {'type': 'user', 'message': {'content': 'Second'}, 'timestamp': 't2'},
+            {'type': 'assistant', 'message': {'content': 'Reply two'}},
+        ]
+        with open(self.transcript_file, 'w') as f:
+            f.write('\n'.join(json.dumps(e) for e in entries) + '\n')
+
+        exchanges, offset = parse_new_exchanges(str(self.transcript_file), 0, 3)
+
+        self.assertEqual(offset, self.transcript_file.stat().st_size)
+        self.assertEqual([(ex['idx'], ex['assistant_text']) for ex in exchanges],
+                         [(3, 'Reply one'), (4, 'Reply two')])
+
+    def test_malformed_entries_skipped(self):
+        """Test entries with unexpected content shapes are skipped, not fatal."""
+        lines = [
+            '{"type":"user","message":{"content":null}}',
+            '{"type":"user","message":"str"}',
+            '{"type":"assistant","message":{"content":5}}',
+            '{"type":"user","message":{"content":[{"type":"text","text":null},"x"]}}',
+            json.dumps({'type': 'user', 'message': {'content': 'Hello'}}),
+            json.dumps({'type': 'assistant', 'message': {'content': 'Hi'}}),
+        ]
+        self.transcript_file.write_text('\n'.join(lines) + '\n')
+
+        exchanges, offset = parse_new_exchanges(str(self.transcript_file))
+
+        self.assertEqual([(ex['user_text'], ex['assistant_text']) for ex in exchanges],
+                         [('Hello', 'Hi')])
+        self.assertEqual(offset, self.transcript_file.stat().st_size)
+
+    def test_crlf_and_blank_lines(self):
+        """Test CRLF line endings and blank lines parse like plain newlines."""
+        entries = [
+            {'type': 'user', 'message': {'content': 'Hi'}, 'timestamp': 't1'},
+            {'type': 'assistant', 'message': {'content': 'Hello'}},
+        ]
+        self.transcript_file.write_bytes(
+            b'\r\n'.join(json.dumps(e).encode() for e in entries) + b'\r\n\r\n'
+        )
+
+        exchanges, _ = parse_new_exchanges(str(self.transcript_file))
+
+        self.assertEqual([(ex['user_text'], ex['assistant_text']) for ex in exchanges],
+                         [('Hi', 'Hello')])
+
+
 class TestBuildNewExchanges(unittest.TestCase):
     """Tests for build_new_exchanges function."""
 
@@ -218,6 +364,20 @@ class TestBuildNewExchanges(unittest.TestCase):
 
         self.assertEqual(exchanges[0]['idx'], 10)
 
+    def test_long_text_truncated(self):
+        """Test stored text is truncated exactly as truncate_text does."""
+        long_text = 'word ' * 500
+        messages = [
+            {'role': 'user', 'text': long_text, 'timestamp': ''},
+            {'role': 'assistant', 'text': 'Short', 'timestamp': ''},
+        ]
+
+        exchange = build_new_exchanges(messages)[0]
+
+        self.assertEqual(exchange['user_text'], truncate_text(long_text, MAX_CHARS_PER_MESSAGE))
+        self.assertEqual(exchange['assistant_text'], 'Short')
+        self.assertEqual(exchange['preview'], make_preview(long_text))
+
 
 class TestGetTranscriptSize(unittest.TestCase):
     """Tests for get_transcript_size function."""
@@ -229,7 +389,6 @@ class TestGetTranscriptSize(unittest.TestCase):
 
     def tearDown(self):
         """Clean up test fixtures."""
-        import shutil
         shutil.rmtree(self.temp_dir, ignore_errors=True)
 
     def test_existing_file(self):
@@ -247,25 +406,140 @@ class TestGetTranscriptSize(unittest.TestCase):
         self.assertEqual(result, 0)
 
 
+class TestSessionCursor(unittest.TestCase):
+    """Tests for resuming a deleted index from the session cursor."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.index_dir = Path(self.temp_dir) / 'context-recall'
+        self.transcript_file = Path(self.temp_dir) / 'transcript.jsonl'
+        self.transcript_file.write_text('{}\n')
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+
+        # The header is written through utils, so patch its paths too
+        patches = [
+            patch.object(save_context_snapshot, 'INDEX_DIR', self.index_dir),
+            patch.object(save_context_snapshot, 'INDEX_FILE', self.index_dir / 'index.json'),
+            patch.object(save_context_snapshot, 'EXCHANGES_FILE', self.index_dir / 'index.jsonl'),
+            patch.object(utils, 'INDEX_DIR', self.index_dir),
+            patch.object(utils, 'INDEX_FILE', self.index_dir / 'index.json'),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def _save(self):
+        save_index({
+            'session_id': 's1',
+            'session_start': '2025-01-05T09:00:00Z',
+            'total_exchanges': 7,
+            'transcript_path': str(self.transcript_file),
+            '_byte_offset': 3,
+            '_mtime': os.path.getmtime(self.transcript_file),
+        })
+
+    def test_save_writes_cursor(self):
+        """Test that saving the index also writes the cursor."""
+        self._save()
+        self.assertTrue(get_cursor_file('s1').exists())
+
+    def test_resume_when_index_missing(self):
+        """Test a deleted index resumes from the cursor offset."""
+        self._save()
+        (self.index_dir / 'index.json').unlink()
+
+        index = load_existing_index('s1', str(self.transcript_file))
+
+        self.assertEqual(index['_byte_offset'], 3)
+        self.assertEqual(index['total_exchanges'], 7)
+
+        header = json.loads((self.index_dir / 'index.json').read_bytes())
+        self.assertEqual(header['session_start'], '2025-01-05T09:00:00Z')
+
+    def test_no_resume_when_transcript_changed(self):
+        """Test the cursor is ignored once the transcript has changed."""
+        self._save()
+        (self.index_dir / 'index.json').unlink()
+        os.utime(self.transcript_file, (0, 0))
+
+        self.assertIsNone(load_existing_index('s1', str(self.transcript_file)))
+
+
+class TestAppendExchanges(unittest.TestCase):
+    """Tests for append_exchanges function."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_file = Path(self.temp_dir) / 'index.jsonl'
+        self.patches = [
+            patch.object(save_context_snapshot, 'INDEX_DIR', Path(self.temp_dir)),
+            patch.object(save_context_snapshot, 'EXCHANGES_FILE', self.log_file),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _exchange(self, preview):
+        """Build a minimal exchange with the given preview."""
+        return {'idx': 0, 'preview': preview, 'timestamp': '',
+                'user_text': preview, 'assistant_text': ''}
+
+    def test_appends_one_line_per_exchange(self):
+        """Test each exchange becomes one compact JSON row."""
+        size = append_exchanges([self._exchange('first')], 0)
+        size = append_exchanges([self._exchange('second'), self._exchange('third')], size)
+
+        lines = self.log_file.read_bytes().splitlines()
+        self.assertEqual([json.loads(l)[0] for l in lines], ['first', 'second', 'third'])
+        self.assertEqual(size, self.log_file.stat().st_size)
+
+    def test_discards_uncommitted_tail(self):
+        """Test bytes past the recorded size are dropped before appending."""
+        size = append_exchanges([self._exchange('first')], 0)
+        with open(self.log_file, 'ab') as f:
+            f.write(b'["torn')
+
+        size = append_exchanges([self._exchange('second')], size)
+
+        lines = self.log_file.read_bytes().splitlines()
+        self.assertEqual([json.loads(l)[0] for l in lines], ['first', 'second'])
+        self.assertEqual(size, self.log_file.stat().st_size)
+
+
 class TestMainHookBehavior(unittest.TestCase):
-    """Integration tests for main hook behavior using subprocess."""
+    """Tests for the hook entry point."""
 
     def setUp(self):
         """Set up test fixtures."""
         self.temp_dir = tempfile.mkdtemp()
         self.transcript_file = Path(self.temp_dir) / 'transcript.jsonl'
         self.context_dir = Path(self.temp_dir) / '.claude' / 'context-recall'
+        self.patches = [
+            patch.object(save_context_snapshot, 'INDEX_DIR', self.context_dir),
+            patch.object(save_context_snapshot, 'INDEX_FILE', self.context_dir / 'index.json'),
+            patch.object(save_context_snapshot, 'EXCHANGES_FILE', self.context_dir / 'index.jsonl'),
+            patch.object(save_context_snapshot, 'LOG_FILE', self.context_dir / 'recall-events.log'),
+            patch.object(utils, 'INDEX_DIR', self.context_dir),
+            patch.object(utils, 'INDEX_FILE', self.context_dir / 'index.json'),
+        ]
+        for p in self.patches:
+            p.start()
 
     def tearDown(self):
         """Clean up test fixtures."""
-        import shutil
+        for p in self.patches:
+            p.stop()
         shutil.rmtree(self.temp_dir, ignore_errors=True)
 
-    def test_recall_command_logs_event(self):
-        """Test that /recall command triggers logging."""
-        import subprocess
-
-        # Create transcript
+    def _write_transcript(self):
+        """Write a one-exchange transcript."""
         lines = [
             json.dumps({
                 'type': 'user',
@@ -281,74 +555,89 @@ class TestMainHookBehavior(unittest.TestCase):
         with open(self.transcript_file, 'w') as f:
             f.write('\n'.join(lines))
 
-        # Run hook
-        hook_script = Path(__file__).parent.parent / 'hooks' / 'save_context_snapshot.py'
-        input_data = json.dumps({
-            'session_id': 'test-session',
-            'transcript_path': str(self.transcript_file),
-            'user_prompt': '/recall'
-        })
-
-        env = os.environ.copy()
-        env['HOME'] = self.temp_dir
+    def test_recall_command_logs_event(self):
+        """Test that /recall command triggers logging."""
+        self._write_transcript()
 
-        result = subprocess.run(
-            ['python3', str(hook_script)],
-            input=input_data,
-            capture_output=True,
-            text=True,
-            env=env
-        )
+        with patch('sys.stderr'):
+            output = run_hook({
+                'session_id': 'test-session',
+                'transcript_path': str(self.transcript_file),
+                'user_prompt': '/recall'
+            })
 
-        # Check output
-        output = json.loads(result.stdout)
         self.assertIn('systemMessage', output)
         self.assertIn('Context recall logged', output['systemMessage'])
+        self.assertTrue((self.context_dir / 'recall-events.log').exists())
 
     def test_non_recall_command(self):
         """Test that non-recall commands save index without logging."""
-        import subprocess
+        self._write_transcript()
 
-        # Create transcript
-        lines = [
-            json.dumps({
-                'type': 'user',
-                'message': {'content': [{'type': 'text', 'text': 'Hello'}]},
-                'timestamp': '2025-01-05T09:00:00Z'
-            }),
-            json.dumps({
-                'type': 'assistant',
-                'message': {'content': [{'type': 'text', 'text': 'Hi!'}]},
-                'timestamp': '2025-01-05T09:00:05Z'
-            }),
-        ]
-        with open(self.transcript_file, 'w') as f:
-            f.write('\n'.join(lines))
-
-        hook_script = Path(__file__).parent.parent / 'hooks' / 'save_context_snapshot.py'
-        input_data = json.dumps({
+        output = run_hook({
             'session_id': 'test-session',
             'transcript_path': str(self.transcript_file),
             'user_prompt': 'Just a regular message'
         })
 
+        self.assertEqual(output, {})
+
+        # Check that index was created
+        index_file = self.context_dir / 'index.json'
+        self.assertTrue(index_file.exists())
+        self.assertFalse((self.context_dir / 'recall-events.log').exists())
+
+    def test_session_switches_keep_incremental_updates(self):
+        """Test the log size stays exact across rebuilds for new sessions."""
+        def write(path, count):
+            with open(path, 'w') as f:
+                for i in range(count):
+                    f.write(json.dumps({'type': 'user', 'message': {'content': f'q{i}'}}) + '\n')
+                    f.write(json.dumps({'type': 'assistant', 'message': {'content': f'a{i}'}}) + '\n')
+
+        other_transcript = Path(self.temp_dir) / 'other.jsonl'
+        write(self.transcript_file, 3)
+        write(other_transcript, 1)
+
+        # Each switch rebuilds the log from scratch, shrinking it
+        for session_id, path in (('a', self.transcript_file), ('b', other_transcript),
+                                 ('a', self.transcript_file)):
+            run_hook({'session_id': session_id, 'transcript_path': str(path)})
+
+        header = json.loads((self.context_dir / 'index.json').read_bytes())
+        self.assertEqual(header['_exchanges_size'],
+                         (self.context_dir / 'index.jsonl').stat().st_size)
+
+        # The next prompt continues from the stored offset instead of rebuilding
+        with open(self.transcript_file, 'a') as f:
+            f.write(json.dumps({'type': 'user', 'message': {'content': 'q3'}}) + '\n')
+            f.write(json.dumps({'type': 'assistant', 'message': {'content': 'a3'}}) + '\n')
+        with patch.object(save_context_snapshot, 'parse_new_exchanges',
+                          wraps=save_context_snapshot.parse_new_exchanges) as parse:
+            run_hook({'session_id': 'a', 'transcript_path': str(self.transcript_file)})
+
+        parse.assert_called_once_with(str(self.transcript_file), header['_byte_offset'], 4)
+        header = json.loads((self.context_dir / 'index.json').read_bytes())
+        self.assertEqual(header['total_exchanges'], 4)
+
+    def test_invalid_input_reports_error(self):
+        """Test malformed stdin yields a non-blocking error message."""
+        hook_script = Path(__file__).parent.parent / 'hooks' / 'save_context_snapshot.py'
         env = os.environ.copy()
         env['HOME'] = self.temp_dir
 
+        # Same interpreter as the suite; -S skips site setup, which the
+        # stdlib-only hook does not need
         result = subprocess.run(
-            ['python3', str(hook_script)],
-            input=input_data,
+            [sys.executable, '-S', str(hook_script)],
+            input=b'not json \xe2\x9c\x93',
             capture_output=True,
-            text=True,
             env=env
         )
 
+        self.assertEqual(result.returncode, 0)
         output = json.loads(result.stdout)
-        self.assertEqual(output, {})
-
-        # Check that index was created
-        index_file = self.context_dir / 'index.json'
-        self.assertTrue(index_file.exists())
+        self.assertIn('Hook error', output['systemMessage'])
 
 
 if __name__ == '__main__':
@@ -3,6 +3,7 @@
 
 import json
 import os
+import shutil
 import sys
 import tempfile
 import unittest
@@ -23,6 +24,7 @@ from utils import (
     format_timestamp,
     format_date,
     parse_time_query,
+    exchange_minutes,
     PAGE_SIZE,
 )
 
@@ -136,6 +138,19 @@ class TestFindPageForTime(unittest.TestCase):
         # Should return a valid page number
         self.assertGreaterEqual(page, 1)
 
+    def test_single_and_multi_day_sessions(self):
+        """Test the page holds the earliest closest exchange either way."""
+        times = [f'{9 + i // 6:02d}:{(i % 6) * 10:02d}' for i in range(30)]
+        for days in (['2025-01-05'], ['2025-01-05', '2025-01-06']):
+            exchanges = [
+                {'idx': n + 1, 'timestamp': f'{day}T{t}:00Z'}
+                for n, (day, t) in enumerate((d, t) for d in days for t in times)
+            ]
+            hour, minute = divmod(exchange_minutes(exchanges)[7], 60)
+            target = datetime.now().replace(hour=hour, minute=minute)
+            expected = (len(exchanges) - 1 - 7) // PAGE_SIZE + 1
+            self.assertEqual(find_page_for_time(exchanges, target), expected)
+
     def test_empty_exchanges(self):
         """Test with empty exchanges list."""
         page = find_page_for_time([], datetime.now())
@@ -173,6 +188,17 @@ class TestFormatPage(unittest.TestCase):
 
         self.assertIn('page', result.lower())
 
+    def test_older_page_most_recent_first(self):
+        """Test a later page holds the next-older exchanges, newest first."""
+        exchanges = [
+            {'idx': i, 'preview': f'Exchange {i}', 'timestamp': f'2025-01-05T09:{i:02d}:00Z'}
+            for i in range(1, 50)
+        ]
+        result = format_page(exchanges, 3, 49, '2025-01-05T09:00:00Z')
+
+        shown = [line.split()[0] for line in result.splitlines() if line.startswith('**#')]
+        self.assertEqual(shown, [f'**#{i}**' for i in range(9, 0, -1)])
+
 
 class TestLoadIndex(unittest.TestCase):
     """Tests for load_index function."""
@@ -185,7 +211,6 @@ class TestLoadIndex(unittest.TestCase):
 
     def tearDown(self):
         """Clean up test fixtures."""
-        import shutil
         shutil.rmtree(self.temp_dir, ignore_errors=True)
 
     def test_load_valid_index(self):
@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 """Tests for the shared utils module."""
 
+import json
+import shutil
+import tempfile
 import unittest
 import sys
 from pathlib import Path
 from datetime import datetime
+from unittest.mock import patch
 
 # Add scripts directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent / 'scripts'))
@@ -19,10 +23,22 @@ from utils import (
     format_date,
     format_short_date,
     get_date_from_timestamp,
+    parse_timestamp,
     search_in_text,
+    make_text_matcher,
     find_exchanges_by_time,
     build_exchanges_from_messages,
+    parse_transcript_messages,
+    iter_exchanges,
+    load_index_header,
+    save_index,
+    read_tail_lines,
+    tail_exchanges,
+    json_loader,
+    json_loads,
+    FAST_JSON_MIN_BYTES,
 )
+import utils
 
 
 class TestExtractTextContent(unittest.TestCase):
@@ -54,11 +70,27 @@ class TestExtractTextContent(unittest.TestCase):
         }
         self.assertEqual(extract_text_content(message), 'Hello\nworld')
 
+    def test_string_blocks_in_array(self):
+        """Test bare strings mixed with blocks; other items are skipped."""
+        message = {'content': ['Hello', {'type': 'tool_use', 'id': 'x'}, 3, {'type': 'text'}]}
+        self.assertEqual(extract_text_content(message), 'Hello\n')
+
     def test_empty_content(self):
         """Test extracting from empty content."""
         self.assertEqual(extract_text_content({}), '')
         self.assertEqual(extract_text_content({'content': []}), '')
 
+    def test_single_block_content(self):
+        """Test extracting from content holding a single block."""
+        self.assertEqual(extract_text_content({'content': [{'type': 'text', 'text': 'Hi'}]}), 'Hi')
+        self.assertEqual(extract_text_content({'content': ['Hi']}), 'Hi')
+        self.assertEqual(extract_text_content({'content': [{'type': 'tool_use', 'id': 'x'}]}), '')
+
+    def test_non_list_content(self):
+        """Test content that is neither a string nor a list still iterates."""
+        self.assertEqual(extract_text_content({'content': ('Hi',)}), 'Hi')
+        self.assertIsInstance(extract_text_content({'content': {'text': 1}}), str)
+
 
 class TestMakePreview(unittest.TestCase):
     """Tests for make_preview function."""
@@ -81,6 +113,14 @@ class TestMakePreview(unittest.TestCase):
         self.assertNotIn('\n', preview)
         self.assertEqual(preview, 'Hello world test')
 
+    def test_long_text_matches_full_normalization(self):
+        """Test long and whitespace-padded texts preview as if fully normalized."""
+        long_text = 'Some words here\n' * 500
+        self.assertEqual(make_preview(long_text), ' '.join(long_text.split())[:77] + '...')
+
+        padded = ' ' * 1000 + 'short' + '\n' * 1000
+        self.assertEqual(make_preview(padded), 'short')
+
 
 class TestTruncateText(unittest.TestCase):
     """Tests for truncate_text function."""
@@ -120,10 +160,22 @@ class TestParseTimeQuery(unittest.TestCase):
         self.assertEqual(result.hour, 14)
         self.assertEqual(result.minute, 30)
 
+    def test_explicit_now(self):
+        """Test the date comes from the given now instead of the clock."""
+        result = parse_time_query('2pm', datetime(2026, 1, 5, 9, 0))
+        self.assertEqual(result, datetime(2026, 1, 5, 14, 0))
+
+    def test_midnight_and_noon(self):
+        """Test 12am and 12pm map to hours 0 and 12."""
+        self.assertEqual(parse_time_query('12am').hour, 0)
+        self.assertEqual(parse_time_query('12:15 pm').hour, 12)
+
     def test_invalid_format(self):
         """Test invalid format returns None."""
         self.assertIsNone(parse_time_query('invalid'))
         self.assertIsNone(parse_time_query(''))
+        self.assertIsNone(parse_time_query('14:30pm'))
+        self.assertIsNone(parse_time_query('2:60pm'))
 
 
 class TestParseDateTimeQuery(unittest.TestCase):
@@ -177,10 +229,29 @@ class TestFormatFunctions(unittest.TestCase):
         self.assertIn('Jan', result)
         self.assertIn('5', result)
 
+    def test_exact_formats(self):
+        """Test the exact text produced for a known local time."""
+        local = datetime(2026, 1, 5, 0, 5)
+        with patch.object(utils, '_local_time', return_value=local):
+            self.assertEqual(format_timestamp('x'), '12:05 am')
+            self.assertEqual(format_date('x'), 'Jan 05, 2026 at 12:05 AM')
+            self.assertEqual(format_short_date('x'), 'Jan 5')
+
     def test_get_date_from_timestamp(self):
         """Test extracting date from timestamp."""
         result = get_date_from_timestamp('2026-01-05T14:30:00Z')
         self.assertEqual(result, '2026-01-05')
+        self.assertEqual(get_date_from_timestamp('2026-01-05T23:30:00-08:00'), '2026-01-05')
+        self.assertIsNone(get_date_from_timestamp('2026-02-30T00:00:00Z'))
+        self.assertIsNone(get_date_from_timestamp('not a time'))
+        self.assertIsNone(get_date_from_timestamp(None))
+
+    def test_parse_timestamp(self):
+        """Test parsing 'Z' and offset timestamps, rejecting invalid ones."""
+        self.assertEqual(parse_timestamp('2026-01-05T14:30:00Z').utcoffset().total_seconds(), 0)
+        self.assertEqual(parse_timestamp('2026-01-05T14:30:00+02:00').hour, 14)
+        self.assertIsNone(parse_timestamp('not a time'))
+        self.assertIsNone(parse_timestamp(None))
 
     def test_empty_timestamp(self):
         """Test formatting empty timestamp."""
@@ -204,6 +275,22 @@ class TestSearchInText(unittest.TestCase):
         self.assertTrue(search_in_text('test', ''))  # empty keyword matches
 
 
+class TestMakeTextMatcher(unittest.TestCase):
+    """Tests for make_text_matcher function."""
+
+    def test_single_keyword(self):
+        """Test a single keyword matches case-insensitively."""
+        matches = make_text_matcher('World')
+        self.assertTrue(matches('hello WORLD'))
+        self.assertFalse(matches('hello'))
+
+    def test_caseless_keywords(self):
+        """Test keywords without letters match without lowercasing."""
+        self.assertTrue(make_text_matcher('404')('HTTP 404 Not Found'))
+        self.assertFalse(make_text_matcher('404')('HTTP 500'))
+        self.assertTrue(make_text_matcher(':8080')('Listening on :8080'))
+
+
 class TestFindExchangesByTime(unittest.TestCase):
     """Tests for find_exchanges_by_time function."""
 
@@ -218,12 +305,72 @@ class TestFindExchangesByTime(unittest.TestCase):
         result = find_exchanges_by_time(exchanges, target, window=3)
         self.assertIn(2, result)  # 2pm should be closest to 2:30pm
 
+    def test_find_closest_within_date(self):
+        """Test matching within a date picks the earliest closest exchange."""
+        exchanges = [
+            {'idx': 1, 'timestamp': '2026-01-04T14:00:00Z'},
+            {'idx': 2, 'timestamp': '2026-01-05T09:00:00Z'},
+            {'idx': 3, 'timestamp': '2026-01-05T12:00:00Z'},
+            {'idx': 4, 'timestamp': '2026-01-05T12:00:00Z'},
+            {'idx': 5, 'timestamp': '2026-01-05T16:00:00Z'},
+        ]
+        target = datetime(2026, 1, 5, 14, 0)
+        result = find_exchanges_by_time(exchanges, target, '2026-01-05', window=1)
+        self.assertEqual(result, [3])
+
+    def test_mixed_offsets_on_one_date(self):
+        """Test times that do not rise within a date still find the closest."""
+        exchanges = [
+            {'idx': 1, 'timestamp': '2025-01-05T10:00:00+05:00'},
+            {'idx': 2, 'timestamp': '2025-01-05T06:00:00Z'},
+            {'idx': 3, 'timestamp': '2025-01-05T06:30:00Z'},
+        ]
+        for target_date in (None, '2025-01-05'):
+            for hour, minute, expected in ((9, 55, [1]), (6, 5, [2]), (10, 5, [1])):
+                target = datetime(2025, 1, 5, hour, minute)
+                result = find_exchanges_by_time(exchanges, target, target_date, window=1)
+                self.assertEqual(result, expected)
+
     def test_empty_exchanges(self):
         """Test with empty exchanges list."""
         result = find_exchanges_by_time([], datetime.now())
         self.assertEqual(result, [])
 
 
+class TestParseTranscriptMessages(unittest.TestCase):
+    """Tests for parse_transcript_messages function."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.transcript = Path(self.temp_dir) / 'transcript.jsonl'
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_skips_stray_lines(self):
+        """Test malformed and non-object lines are skipped, not fatal."""
+        lines = [
+            json.dumps({'type': 'user', 'message': {'content': 'Hi'}, 'timestamp': 't1'}),
+            '"user"',
+            '{"type": "user", broken',
+            json.dumps({'type': 'assistant', 'message': {'content': [{'type': 'text', 'text': 'Hello'}]}}),
+        ]
+        self.transcript.write_text('\n'.join(lines) + '\n')
+
+        messages = parse_transcript_messages(str(self.transcript))
+
+        self.assertEqual(messages, [
+            {'role': 'user', 'text': 'Hi', 'timestamp': 't1'},
+            {'role': 'assistant', 'text': 'Hello', 'timestamp': ''},
+        ])
+
+    def test_missing_file(self):
+        """Test a missing transcript yields no messages."""
+        self.assertEqual(parse_transcript_messages(str(self.transcript)), [])
+
+
 class TestBuildExchangesFromMessages(unittest.TestCase):
     """Tests for build_exchanges_from_messages function."""
 
@@ -249,6 +396,165 @@ class TestBuildExchangesFromMessages(unittest.TestCase):
         exchanges = build_exchanges_from_messages(messages)
         self.assertEqual(len(exchanges), 0)
 
+    def test_only_adjacent_pairs(self):
+        """Test a user message pairs only with the message right after it."""
+        messages = [
+            {'role': 'assistant', 'text': 'Orphan reply'},
+            {'role': 'user', 'text': 'First'},
+            {'role': 'user', 'text': 'Second'},
+            {'role': 'assistant', 'text': 'Answer'},
+            {'role': 'assistant', 'text': 'Follow-up'},
+        ]
+        exchanges = build_exchanges_from_messages(messages)
+        self.assertEqual([(ex['user_text'], ex['assistant_text']) for ex in exchanges],
+                         [('Second', 'Answer')])
+
+
+class TestJsonLoader(unittest.TestCase):
+    """Tests for json_loader function."""
+
+    def test_small_input_uses_default_parser(self):
+        """Test small inputs don't pull in the fast parser."""
+        self.assertIs(json_loader(100), json_loads)
+
+    def test_large_input_parses_bytes(self):
+        """Test the parser chosen for large inputs handles bytes."""
+        loads = json_loader(FAST_JSON_MIN_BYTES)
+        self.assertEqual(loads(b'{"a": [1, "\xc3\xa9"]}'), {'a': [1, '\u00e9']})
+
+
+class TestIndexHeader(unittest.TestCase):
+    """Tests for save_index and load_index_header functions."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.index_file = Path(self.temp_dir) / 'index.json'
+        self.patches = [
+            patch.object(utils, 'INDEX_DIR', Path(self.temp_dir)),
+            patch.object(utils, 'INDEX_FILE', self.index_file),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_round_trip(self):
+        """Test a saved header loads back unchanged, leaving no temp file."""
+        header = {'session_id': 'abc', 'total_exchanges': 3, '_exchanges_size': 120}
+
+        self.assertTrue(save_index(header))
+
+        self.assertEqual(load_index_header(), header)
+        self.assertEqual([p.name for p in Path(self.temp_dir).iterdir()], ['index.json'])
+
+    def test_compact_by_default(self):
+        """Test the header is written on one line unless pretty output is enabled."""
+        save_index({'session_id': 'abc', 'total_exchanges': 3})
+        self.assertNotIn(b'\n', self.index_file.read_bytes())
+
+        with patch.object(utils, 'PRETTY_INDEX', True):
+            save_index({'session_id': 'abc', 'total_exchanges': 3})
+        self.assertIn(b'\n  "session_id"', self.index_file.read_bytes())
+
+    def test_missing_or_invalid(self):
+        """Test a missing or corrupt header loads as None."""
+        self.assertIsNone(load_index_header())
+        self.index_file.write_text('{not json')
+        self.assertIsNone(load_index_header())
+
+
+class TestIterExchanges(unittest.TestCase):
+    """Tests for iter_exchanges function."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_file = Path(self.temp_dir) / 'index.jsonl'
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_inline_exchanges(self):
+        """Test older single-file indexes are read as-is."""
+        index = {'exchanges': [{'idx': 1}, {'idx': 2}]}
+        self.assertEqual([ex['idx'] for ex in iter_exchanges(index)], [1, 2])
+
+    def test_stops_at_recorded_size(self):
+        """Test lines past the header's recorded size are ignored."""
+        committed = b'{"idx": 1}\n{"idx": 2}\n'
+        self.log_file.write_bytes(committed + b'{"idx": 3}\n')
+        index = {'_exchanges_size': len(committed)}
+
+        with patch.object(utils, 'EXCHANGES_FILE', self.log_file):
+            result = [ex['idx'] for ex in iter_exchanges(index)]
+
+        self.assertEqual(result, [1, 2])
+
+    def test_rows_numbered_by_line(self):
+        """Test compact rows become exchange dicts numbered by line."""
+        log = b'["hi", "2026-01-05T10:00:00Z", "hi there", "hello"]\n["bye", "", "bye", ""]\n'
+        self.log_file.write_bytes(log)
+        index = {'_exchanges_size': len(log)}
+
+        with patch.object(utils, 'EXCHANGES_FILE', self.log_file):
+            result = list(iter_exchanges(index))
+
+        self.assertEqual([ex['idx'] for ex in result], [1, 2])
+        self.assertEqual(result[0]['user_text'], 'hi there')
+        self.assertEqual(result[1]['preview'], 'bye')
+
+    def test_missing_log(self):
+        """Test a missing exchange log yields nothing."""
+        with patch.object(utils, 'EXCHANGES_FILE', self.log_file):
+            self.assertEqual(list(iter_exchanges({'_exchanges_size': 10})), [])
+
+
+class TestTailExchanges(unittest.TestCase):
+    """Tests for read_tail_lines and tail_exchanges functions."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.log_file = Path(self.temp_dir) / 'index.jsonl'
+        rows = [[f'q{i}', '', f'q{i}', f'a{i}'] for i in range(1, 51)]
+        self.log = ''.join(json.dumps(row) + '\n' for row in rows).encode()
+        self.log_file.write_bytes(self.log)
+
+    def tearDown(self):
+        """Clean up test fixtures."""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_reads_last_lines(self):
+        """Test the last lines come back whole and in order."""
+        lines = read_tail_lines(self.log_file, 3)
+        self.assertEqual([json.loads(l)[0] for l in lines], ['q48', 'q49', 'q50'])
+
+    def test_empty_file(self):
+        """Test an empty file yields no lines."""
+        self.log_file.write_bytes(b'')
+        self.assertEqual(read_tail_lines(self.log_file, 3), [])
+
+    def test_more_lines_than_file(self):
+        """Test asking for more lines than exist returns them all."""
+        self.assertEqual(len(read_tail_lines(self.log_file, 500)), 50)
+
+    def test_tail_ignores_uncommitted_lines(self):
+        """Test the tail ends at the header's recorded size, numbered by line."""
+        index = {'total_exchanges': 50, '_exchanges_size': len(self.log)}
+        with open(self.log_file, 'ab') as f:
+            f.write(b'["uncommitted", "", "", ""]\n')
+
+        with patch.object(utils, 'EXCHANGES_FILE', self.log_file):
+            result = tail_exchanges(index, 2)
+
+        self.assertEqual([(ex['idx'], ex['preview']) for ex in result], [(49, 'q49'), (50, 'q50')])
+
 
 if __name__ == '__main__':
     unittest.main()